@@ -1,25 +1,74 @@
-from setuptools import setup
+from setuptools import setup, Extension
 from Cython.Build import cythonize
+import os
 import sys
+import tempfile
 import numpy as np
 
+compile_args = [
+    '-O3',           # Max optimization
+    '-march=native', # CPU-specific instrs (AVX2/SSE on your machine)
+    '-ffast-math',   # Aggressive float math (faster expf/fmaxf, assumes no NaN/inf issues)
+    '-funroll-loops',# Auto-unroll small loops (helps h linear, attn outer)
+    '-ftree-vectorize', # Explicit SIMD vectorization
+    '-DNDEBUG',      # Disable debug checks
+] if 'posix' in sys.builtin_module_names else [  # Linux/Mac; for Windows/MSVC, use /O2 /arch:AVX2
+    '/O2', '/arch:AVX2', '/DNDEBUG'
+]
+# libm (pulls in libmvec for the vectorized expf that -ffast-math emits)
+libraries = ['m'] if 'posix' in sys.builtin_module_names else []
+# OpenMP for cychess.root_parallel_search (prange over root moves)
+openmp_args = ['-fopenmp'] if 'posix' in sys.builtin_module_names else ['/openmp']
+
+
+def openmp_available() -> bool:
+    """
+    Probe the compiler with a tiny OpenMP program (Apple clang, for one, rejects -fopenmp).
+    Set CYCHESS_NO_OPENMP=1 to skip it; without OpenMP root_parallel_search runs serially.
+    """
+    if os.environ.get("CYCHESS_NO_OPENMP"):
+        return False
+    from distutils.ccompiler import new_compiler
+    from distutils.errors import CompileError, LinkError
+    from distutils.sysconfig import customize_compiler
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "omp_probe.c")
+        with open(src, "w") as f:
+            f.write("#include <omp.h>\nint main(void) { return omp_get_max_threads() > 0 ? 0 : 1; }\n")
+        try:
+            objects = compiler.compile([src], output_dir=tmp, extra_postargs=openmp_args)
+            compiler.link_executable(objects, os.path.join(tmp, "omp_probe"), output_dir=tmp,
+                                     extra_postargs=openmp_args if 'posix' in sys.builtin_module_names else [])
+        except (CompileError, LinkError):
+            print("OpenMP not available: building cychess without it (serial root search)")
+            return False
+    return True
+
+
+use_openmp = openmp_available()
+
+# Flags must be set per Extension (setup()-level extra_compile_args is ignored).
+# No -fno-exceptions: negamax.pyx is C++ and Cython's C++ exception translation needs them.
+def ext(name: str, openmp: bool = False) -> Extension:
+    return Extension(
+        name,
+        [f"src/cython/{name}.pyx"],
+        include_dirs=[np.get_include()],
+        extra_compile_args=compile_args + (openmp_args if openmp else []),
+        extra_link_args=openmp_args if openmp and 'posix' in sys.builtin_module_names else [],
+        libraries=libraries,
+    )
+
+# The Cython modules are the canonical runtime path: cychess (board, movegen, search,
+# tokenize) and attn_model (AttnModelCompiled, built from AttnModel.attn_compile()).
+# The torch AttnModel is only used for training and to export weights.
 setup(
     ext_modules=cythonize([
-        "src/cython/negamax.pyx",
-        "src/cython/attn_model.pyx",
-        "src/cython/cychess.pyx",
+        ext("negamax"),
+        ext("attn_model"),
+        ext("cychess", openmp=use_openmp),
     ]),
-    include_dirs=[np.get_include()],
-    extra_compile_args=[
-        '-O3',           # Max optimization
-        '-march=native', # CPU-specific instrs (AVX2/SSE on your machine)
-        '-ffast-math',   # Aggressive float math (faster expf/fmaxf, assumes no NaN/inf issues)
-        '-funroll-loops',# Auto-unroll small loops (helps h linear, attn outer)
-        '-ftree-vectorize', # Explicit SIMD vectorization
-        '-fno-exceptions', # Disable exceptions for speed (Cython-safe here)
-        '-DNDEBUG',      # Disable debug checks
-    ] if 'posix' in sys.builtin_module_names else [  # Linux/Mac; for Windows/MSVC, use /O2 /arch:AVX2
-        '/O2', '/arch:AVX2', '/DNDEBUG'
-    ],
     zip_safe=False,
-)
\ No newline at end of file
+)
@@ -0,0 +1,289 @@
+/*
+ * src/cython/attn_kernels.h
+ * SIMD kernels for the sliced-attention forward pass (attn_model.pyx).
+ * AVX2+FMA when the compiler targets it (-march=native / /arch:AVX2), scalar fallback otherwise.
+ */
+#ifndef ATTN_KERNELS_H
+#define ATTN_KERNELS_H
+
+#include <math.h>
+#include <stdint.h>
+
+#if defined(__AVX2__) && (defined(__FMA__) || defined(_MSC_VER))
+#define ATTN_AVX2 1
+#include <immintrin.h>
+#endif
+
+#ifdef ATTN_AVX2
+
+/* Horizontal reductions of 8 lanes */
+static inline float hmax256_ps(__m256 v) {
+    __m128 m = _mm_max_ps(_mm256_castps256_ps128(v), _mm256_extractf128_ps(v, 1));
+    m = _mm_max_ps(m, _mm_movehl_ps(m, m));
+    m = _mm_max_ss(m, _mm_shuffle_ps(m, m, 1));
+    return _mm_cvtss_f32(m);
+}
+
+static inline float hsum256_ps(__m256 v) {
+    __m128 s = _mm_add_ps(_mm256_castps256_ps128(v), _mm256_extractf128_ps(v, 1));
+    s = _mm_add_ps(s, _mm_movehl_ps(s, s));
+    s = _mm_add_ss(s, _mm_shuffle_ps(s, s, 1));
+    return _mm_cvtss_f32(s);
+}
+
+/* exp(x) for 8 floats: Cephes-style range reduction + degree-5 polynomial */
+static inline __m256 exp256_ps(__m256 x) {
+    x = _mm256_min_ps(x, _mm256_set1_ps(88.3762626647949f));
+    x = _mm256_max_ps(x, _mm256_set1_ps(-88.3762626647949f));
+
+    /* n = floor(x / ln2 + 0.5); r = x - n * ln2 (ln2 split in two for precision) */
+    __m256 fx = _mm256_fmadd_ps(x, _mm256_set1_ps(1.44269504088896341f), _mm256_set1_ps(0.5f));
+    fx = _mm256_floor_ps(fx);
+    x = _mm256_fnmadd_ps(fx, _mm256_set1_ps(0.693359375f), x);
+    x = _mm256_fnmadd_ps(fx, _mm256_set1_ps(-2.12194440e-4f), x);
+
+    __m256 z = _mm256_mul_ps(x, x);
+    __m256 y = _mm256_set1_ps(1.9875691500E-4f);
+    y = _mm256_fmadd_ps(y, x, _mm256_set1_ps(1.3981999507E-3f));
+    y = _mm256_fmadd_ps(y, x, _mm256_set1_ps(8.3334519073E-3f));
+    y = _mm256_fmadd_ps(y, x, _mm256_set1_ps(4.1665795894E-2f));
+    y = _mm256_fmadd_ps(y, x, _mm256_set1_ps(1.6666665459E-1f));
+    y = _mm256_fmadd_ps(y, x, _mm256_set1_ps(5.0000001201E-1f));
+    y = _mm256_fmadd_ps(y, z, x);
+    y = _mm256_add_ps(y, _mm256_set1_ps(1.0f));
+
+    /* scale by 2^n */
+    __m256i n = _mm256_cvttps_epi32(fx);
+    n = _mm256_slli_epi32(_mm256_add_epi32(n, _mm256_set1_epi32(127)), 23);
+    return _mm256_mul_ps(y, _mm256_castsi256_ps(n));
+}
+
+#endif /* ATTN_AVX2 */
+
+/*
+ * out[j] = q · K[:, j] for the 64 keys; kt is K transposed ([4][64], row-major).
+ * AVX2: broadcast each q[c] and FMA against 8 keys at a time.
+ */
+static inline void qk_row(const float* q, const float* kt, float* out) {
+#ifdef ATTN_AVX2
+    __m256 q0 = _mm256_set1_ps(q[0]);
+    __m256 q1 = _mm256_set1_ps(q[1]);
+    __m256 q2 = _mm256_set1_ps(q[2]);
+    __m256 q3 = _mm256_set1_ps(q[3]);
+    for (int j = 0; j < 64; j += 8) {
+        __m256 s = _mm256_mul_ps(q0, _mm256_loadu_ps(kt + j));
+        s = _mm256_fmadd_ps(q1, _mm256_loadu_ps(kt + 64 + j), s);
+        s = _mm256_fmadd_ps(q2, _mm256_loadu_ps(kt + 128 + j), s);
+        s = _mm256_fmadd_ps(q3, _mm256_loadu_ps(kt + 192 + j), s);
+        _mm256_storeu_ps(out + j, s);
+    }
+#else
+    for (int j = 0; j < 64; j++) {
+        out[j] = q[0] * kt[j] + q[1] * kt[64 + j] + q[2] * kt[128 + j] + q[3] * kt[192 + j];
+    }
+#endif
+}
+
+/*
+ * In-place numerically stable softmax over a 64-float row.
+ * AVX2: vector max, polynomial exp, and normalization by rcp + one Newton step.
+ */
+static inline void softmax64(float* row) {
+#ifdef ATTN_AVX2
+    __m256 vmax = _mm256_loadu_ps(row);
+    for (int j = 8; j < 64; j += 8)
+        vmax = _mm256_max_ps(vmax, _mm256_loadu_ps(row + j));
+    __m256 m = _mm256_set1_ps(hmax256_ps(vmax));
+
+    __m256 vsum = _mm256_setzero_ps();
+    for (int j = 0; j < 64; j += 8) {
+        __m256 p = exp256_ps(_mm256_sub_ps(_mm256_loadu_ps(row + j), m));
+        _mm256_storeu_ps(row + j, p);
+        vsum = _mm256_add_ps(vsum, p);
+    }
+
+    /* 1/sum: rcp estimate refined by r = r * (2 - s * r) */
+    __m256 s = _mm256_set1_ps(hsum256_ps(vsum));
+    __m256 r = _mm256_rcp_ps(s);
+    r = _mm256_mul_ps(r, _mm256_fnmadd_ps(s, r, _mm256_set1_ps(2.0f)));
+    for (int j = 0; j < 64; j += 8)
+        _mm256_storeu_ps(row + j, _mm256_mul_ps(_mm256_loadu_ps(row + j), r));
+#else
+    float max_v = row[0];
+    for (int j = 1; j < 64; j++)
+        if (row[j] > max_v) max_v = row[j];
+    float sum = 0.0f;
+    for (int j = 0; j < 64; j++) {
+        row[j] = expf(row[j] - max_v);
+        sum += row[j];
+    }
+    float inv = 1.0f / sum;
+    for (int j = 0; j < 64; j++)
+        row[j] *= inv;
+#endif
+}
+
+/*
+ * z[0:8] = Σ_j p[j] * V[j, 0:8] over the 64 keys; v is [64][8] row-major.
+ * AVX2: z is exactly one register, one broadcast + FMA per key.
+ */
+static inline void pv_row(const float* p, const float* v, float* z) {
+#ifdef ATTN_AVX2
+    __m256 acc0 = _mm256_setzero_ps();
+    __m256 acc1 = _mm256_setzero_ps();
+    for (int j = 0; j < 64; j += 2) {
+        acc0 = _mm256_fmadd_ps(_mm256_set1_ps(p[j]), _mm256_loadu_ps(v + j * 8), acc0);
+        acc1 = _mm256_fmadd_ps(_mm256_set1_ps(p[j + 1]), _mm256_loadu_ps(v + j * 8 + 8), acc1);
+    }
+    _mm256_storeu_ps(z, _mm256_add_ps(acc0, acc1));
+#else
+    for (int n = 0; n < 8; n++)
+        z[n] = 0.0f;
+    for (int j = 0; j < 64; j++)
+        for (int n = 0; n < 8; n++)
+            z[n] += p[j] * v[j * 8 + n];
+#endif
+}
+
+/*
+ * Float head, one position: h[o] = ReLU(bias[o] + x · W[o, :]) for 16 outputs over 1024 inputs.
+ * w is (16, 1024) row-major, so each output is one contiguous dot product.
+ * AVX2: 4 independent FMA chains per dot (hides FMA latency), one horizontal sum per output.
+ */
+static inline void head_gemv_f32(const float* x, const float* w, const float* bias, float* h) {
+    for (int o = 0; o < 16; o++) {
+        const float* wr = w + o * 1024;
+        float v;
+#ifdef ATTN_AVX2
+        __m256 a0 = _mm256_setzero_ps(), a1 = _mm256_setzero_ps();
+        __m256 a2 = _mm256_setzero_ps(), a3 = _mm256_setzero_ps();
+        for (int i = 0; i < 1024; i += 32) {
+            a0 = _mm256_fmadd_ps(_mm256_loadu_ps(x + i), _mm256_loadu_ps(wr + i), a0);
+            a1 = _mm256_fmadd_ps(_mm256_loadu_ps(x + i + 8), _mm256_loadu_ps(wr + i + 8), a1);
+            a2 = _mm256_fmadd_ps(_mm256_loadu_ps(x + i + 16), _mm256_loadu_ps(wr + i + 16), a2);
+            a3 = _mm256_fmadd_ps(_mm256_loadu_ps(x + i + 24), _mm256_loadu_ps(wr + i + 24), a3);
+        }
+        v = bias[o] + hsum256_ps(_mm256_add_ps(_mm256_add_ps(a0, a1), _mm256_add_ps(a2, a3)));
+#else
+        v = bias[o];
+        for (int i = 0; i < 1024; i++)
+            v += x[i] * wr[i];
+#endif
+        h[o] = v > 0.0f ? v : 0.0f;
+    }
+}
+
+/*
+ * Float head, batch: H[b, o] = ReLU(bias[o] + X[b, :] · W[o, :]); X is (batch, 1024), H (batch, 16).
+ * AVX2: 4 positions per weight-row pass, so each weight vector load feeds 4 FMAs.
+ */
+static inline void head_gemm_f32(int batch, const float* x, const float* w, const float* bias, float* h) {
+    int b = 0;
+#ifdef ATTN_AVX2
+    for (; b + 4 <= batch; b += 4) {
+        const float* x0 = x + b * 1024;
+        const float* x1 = x0 + 1024;
+        const float* x2 = x1 + 1024;
+        const float* x3 = x2 + 1024;
+        for (int o = 0; o < 16; o++) {
+            const float* wr = w + o * 1024;
+            __m256 a0 = _mm256_setzero_ps(), a1 = _mm256_setzero_ps();
+            __m256 a2 = _mm256_setzero_ps(), a3 = _mm256_setzero_ps();
+            for (int i = 0; i < 1024; i += 8) {
+                __m256 wv = _mm256_loadu_ps(wr + i);
+                a0 = _mm256_fmadd_ps(_mm256_loadu_ps(x0 + i), wv, a0);
+                a1 = _mm256_fmadd_ps(_mm256_loadu_ps(x1 + i), wv, a1);
+                a2 = _mm256_fmadd_ps(_mm256_loadu_ps(x2 + i), wv, a2);
+                a3 = _mm256_fmadd_ps(_mm256_loadu_ps(x3 + i), wv, a3);
+            }
+            float v0 = bias[o] + hsum256_ps(a0);
+            float v1 = bias[o] + hsum256_ps(a1);
+            float v2 = bias[o] + hsum256_ps(a2);
+            float v3 = bias[o] + hsum256_ps(a3);
+            h[b * 16 + o] = v0 > 0.0f ? v0 : 0.0f;
+            h[(b + 1) * 16 + o] = v1 > 0.0f ? v1 : 0.0f;
+            h[(b + 2) * 16 + o] = v2 > 0.0f ? v2 : 0.0f;
+            h[(b + 3) * 16 + o] = v3 > 0.0f ? v3 : 0.0f;
+        }
+    }
+#endif
+    for (; b < batch; b++)
+        head_gemv_f32(x + b * 1024, w, bias, h + b * 16);
+}
+
+/*
+ * Int8 head: h[o] = ReLU(bias[o] + Σ_i x[i] * W[o, i]) for 16 outputs over 1024 inputs.
+ * wq is (16, 1024) int8 with per-output-channel scale w_scale[o] (W ≈ wq * w_scale);
+ * x is quantized per call with a single symmetric scale to [-127, 127].
+ * AVX2: u8×s8 products via sign trick + VPMADDUBSW/VPMADDWD (or VPDPBUSD with AVX-VNNI),
+ * 32 inputs per step, int32 accumulation, one float rescale per output.
+ */
+static inline void head_int8(const float* x, const int8_t* wq, const float* w_scale,
+                             const float* bias, float* h) {
+    int8_t xq[1024];
+    float amax = 0.0f;
+    for (int i = 0; i < 1024; i++) {
+        float a = fabsf(x[i]);
+        if (a > amax) amax = a;
+    }
+    if (amax == 0.0f) {
+        for (int o = 0; o < 16; o++)
+            h[o] = bias[o] > 0.0f ? bias[o] : 0.0f;
+        return;
+    }
+    float x_scale = amax / 127.0f;
+    float inv_x_scale = 127.0f / amax;
+
+#ifdef ATTN_AVX2
+    const __m256 vinv = _mm256_set1_ps(inv_x_scale);
+    const __m256i order = _mm256_setr_epi32(0, 4, 1, 5, 2, 6, 3, 7);
+    for (int i = 0; i < 1024; i += 32) {
+        __m256i a = _mm256_cvtps_epi32(_mm256_mul_ps(_mm256_loadu_ps(x + i), vinv));
+        __m256i b = _mm256_cvtps_epi32(_mm256_mul_ps(_mm256_loadu_ps(x + i + 8), vinv));
+        __m256i c = _mm256_cvtps_epi32(_mm256_mul_ps(_mm256_loadu_ps(x + i + 16), vinv));
+        __m256i d = _mm256_cvtps_epi32(_mm256_mul_ps(_mm256_loadu_ps(x + i + 24), vinv));
+        __m256i ab = _mm256_packs_epi32(a, b);
+        __m256i cd = _mm256_packs_epi32(c, d);
+        __m256i abcd = _mm256_packs_epi16(ab, cd);  /* lane-interleaved; undo with permute */
+        _mm256_storeu_si256((__m256i*)(xq + i), _mm256_permutevar8x32_epi32(abcd, order));
+    }
+
+#if !defined(__AVXVNNI__)
+    const __m256i ones16 = _mm256_set1_epi16(1);
+#endif
+    for (int o = 0; o < 16; o++) {
+        const int8_t* w = wq + o * 1024;
+        __m256i acc = _mm256_setzero_si256();
+        for (int i = 0; i < 1024; i += 32) {
+            __m256i xv = _mm256_loadu_si256((const __m256i*)(xq + i));
+            __m256i wv = _mm256_loadu_si256((const __m256i*)(w + i));
+            /* |x| as u8, sign moved onto w: |x| * sign(x) * w == x * w */
+            __m256i ux = _mm256_sign_epi8(xv, xv);
+            __m256i sw = _mm256_sign_epi8(wv, xv);
+#if defined(__AVXVNNI__)
+            acc = _mm256_dpbusd_avx_epi32(acc, ux, sw);
+#else
+            acc = _mm256_add_epi32(acc, _mm256_madd_epi16(_mm256_maddubs_epi16(ux, sw), ones16));
+#endif
+        }
+        __m128i s = _mm_add_epi32(_mm256_castsi256_si128(acc), _mm256_extracti128_si256(acc, 1));
+        s = _mm_add_epi32(s, _mm_shuffle_epi32(s, 0x4E));
+        s = _mm_add_epi32(s, _mm_shuffle_epi32(s, 0xB1));
+        float v = bias[o] + (float)_mm_cvtsi128_si32(s) * x_scale * w_scale[o];
+        h[o] = v > 0.0f ? v : 0.0f;
+    }
+#else
+    for (int i = 0; i < 1024; i++)
+        xq[i] = (int8_t)lrintf(x[i] * inv_x_scale);
+    for (int o = 0; o < 16; o++) {
+        const int8_t* w = wq + o * 1024;
+        int32_t acc = 0;
+        for (int i = 0; i < 1024; i++)
+            acc += (int32_t)xq[i] * (int32_t)w[i];
+        float v = bias[o] + (float)acc * x_scale * w_scale[o];
+        h[o] = v > 0.0f ? v : 0.0f;
+    }
+#endif
+}
+
+#endif /* ATTN_KERNELS_H */
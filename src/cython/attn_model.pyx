@@ -3,47 +3,79 @@
 # cython: boundscheck=False
 # cython: wraparound=False
 # cython: initializedcheck=False
+# cython: cdivision=True
 
 import numpy as np
 cimport numpy as cnp
-from libc.math cimport expf, fmaxf
+from cpython.pycapsule cimport PyCapsule_New
+
+cdef extern from "attn_kernels.h" nogil:
+    void qk_row(const float* q, const float* kt, float* out)  # AVX2: 8 keys per FMA
+    void softmax64(float* row)                                # AVX2: poly exp + rcp/Newton
+    void pv_row(const float* p, const float* v, float* z)     # AVX2: z[8] in one register
+    void head_int8(const float* x, const signed char* wq, const float* w_scale,
+                   const float* bias, float* h)               # AVX2: u8×s8 dot products
+    void head_gemv_f32(const float* x, const float* w, const float* bias, float* h)  # AVX2: 4 FMA chains
+    void head_gemm_f32(int batch, const float* x, const float* w, const float* bias, float* h)  # 4 rows per pass
+
+# Per-thread working set of one forward pass
+cdef struct AttnScratch:
+    int tokens[64]         # Tokens copied in for nogil
+    float kt[256]          # K transposed: 4*64
+    float v[512]           # 64*8
+    float attn_row[64]     # One softmax row
+    float combined[1024]   # 64*16
+    float h[16]
+
+# Largest batch served from the pooled buffers (matches Board's 256-move batch); bigger ones allocate
+cdef enum:
+    MAX_POOLED_BATCH = 256
 
 cdef class AttnModelCompiled:
     """
     Optimized Cython implementation of the sliced attention model for chess board evaluation.
     Weights are copied to fixed-size C arrays during initialization for nogil-compatible forward pass.
     - embed: (960, 24) float32 → embed_flat[23040]
-    - head_weight: (1024, 16) float32 → head_w_flat[16384]
+    - head_weight: (1024, 16) float32 → head_w_flat[16384], stored transposed (16, 1024) row-major
     - head_bias: (16,) float32 → head_b_flat[16]
     - out_weight: (16, 1) float32 → out_w_flat[16]
     - out_bias: (1,) float32 → out_b_flat[1]
+    - head_weight_q / head_scale (optional): (16, 1024) int8 + (16,) float32 per-output-channel
+      scales; when given, the 1024→16 head runs in int8 (activations quantized per call).
     
     Forward: takes tokens (64,) int32/uint8 array, returns single float logit.
     All operations manual (loops for matmul/softmax) for fixed-size efficiency; fully nogil.
+    Attention is fused per query row (QKᵀ → softmax → ·V), so the 64x64 matrix is never stored.
+
+    Working buffers are allocated once per thread slot (num_threads) at construction; a thread
+    passes its slot as tid so forward/forward_batch never allocate and never share scratch.
     """
     # Fixed-size C arrays (no memoryviews for nogil safety)
     cdef float embed_flat[23040]  # 960 * 24
-    cdef float head_w_flat[16384]  # 1024 * 16
+    cdef float head_w_flat[16384]  # 16 * 1024, row per output
     cdef float head_b_flat[16]     # 16
     cdef float out_w_flat[16]      # 16 * 1
     cdef float out_b_flat[1]       # 1
+
+    # Optional int8 head (per-output-channel scales)
+    cdef signed char head_wq_flat[16384]  # 16 * 1024, row per output
+    cdef float head_scale_flat[16]
+    cdef bint quantized
     
-    # Temp buffers (flat 1D C arrays)
-    cdef float q_flat[256]       # 64*4
-    cdef float k_flat[256]       # 64*4
-    cdef float v_flat[512]       # 64*8
-    cdef float e_flat[512]       # 64*8
-    cdef float attn_flat[4096]   # 64*64
-    cdef float z_flat[512]       # 64*8
-    cdef float combined_flat[1024]  # 64*16
-    cdef float h_flat[16]        # 16
-    cdef float value             # scalar
-    
-    # Tokens buffer (copied in forward for nogil)
-    cdef int tokens_c[64]        # 64 ints
+    # Temp buffers, one set per thread slot (NumPy-owned, accessed through raw pointers)
+    cdef readonly int num_threads
+    cdef object scratch_arr
+    cdef AttnScratch* scratch
+    cdef object batch_combined_arr   # (num_threads, MAX_POOLED_BATCH, 1024) float32
+    cdef object batch_hidden_arr     # (num_threads, MAX_POOLED_BATCH, 16) float32
+    cdef float* batch_combined
+    cdef float* batch_hidden
     
-    def __init__(self, embed, head_weight, head_bias, out_weight, out_bias):
+    def __init__(self, embed, head_weight, head_bias, out_weight, out_bias, head_weight_q=None, head_scale=None,
+                 int num_threads=1):
         # Validate inputs (embed etc. expected as np.ndarray float32)
+        if num_threads < 1:
+            raise ValueError(f"num_threads must be >= 1, got {num_threads}")
         if not isinstance(embed, np.ndarray) or embed.dtype != np.float32:
             raise ValueError("embed must be float32 ndarray")
         if embed.shape[0] != 960 or embed.shape[1] != 24:
@@ -68,6 +100,17 @@ cdef class AttnModelCompiled:
             raise ValueError("out_bias must be float32 ndarray")
         if out_bias.shape[0] != 1:
             raise ValueError(f"out_bias shape must be (1,), got {out_bias.shape}")
+
+        self.quantized = head_weight_q is not None
+        if self.quantized:
+            if not isinstance(head_weight_q, np.ndarray) or head_weight_q.dtype != np.int8:
+                raise ValueError("head_weight_q must be int8 ndarray")
+            if head_weight_q.shape[0] != 16 or head_weight_q.shape[1] != 1024:
+                raise ValueError(f"head_weight_q shape must be (16, 1024), got {head_weight_q.shape}")
+            if not isinstance(head_scale, np.ndarray) or head_scale.dtype != np.float32:
+                raise ValueError("head_scale must be float32 ndarray")
+            if head_scale.shape[0] != 16:
+                raise ValueError(f"head_scale shape must be (16,), got {head_scale.shape}")
         
         # Copy to fixed C arrays (GIL ok here, as init is Python-called)
         cdef int i, j
@@ -82,10 +125,10 @@ cdef class AttnModelCompiled:
             for j in range(24):
                 self.embed_flat[i * 24 + j] = embed_view[i, j]
         
-        # Head weight: row-major flat (1024 rows, 16 cols)
+        # Head weight: transposed to (16 rows, 1024 cols) so each output is a contiguous dot product
         for i in range(1024):
             for j in range(16):
-                self.head_w_flat[i * 16 + j] = head_w_view[i, j]
+                self.head_w_flat[j * 1024 + i] = head_w_view[i, j]
         
         # Head bias
         for i in range(16):
@@ -98,101 +141,171 @@ cdef class AttnModelCompiled:
         # Out bias
         self.out_b_flat[0] = out_b_view[0]
 
-    cpdef float forward(self, tokens):
+        # Int8 head: row-major flat (16 rows, 1024 cols)
+        cdef cnp.ndarray[cnp.int8_t, ndim=2] head_wq_view
+        cdef cnp.ndarray[cnp.float32_t, ndim=1] head_scale_view
+        if self.quantized:
+            head_wq_view = head_weight_q
+            head_scale_view = head_scale
+            for i in range(16):
+                for j in range(1024):
+                    self.head_wq_flat[i * 1024 + j] = head_wq_view[i, j]
+                self.head_scale_flat[i] = head_scale_view[i]
+
+        # Scratch pool
+        self.num_threads = num_threads
+        self.scratch_arr = np.zeros((num_threads, sizeof(AttnScratch)), dtype=np.uint8)
+        self.scratch = <AttnScratch*>cnp.PyArray_DATA(self.scratch_arr)
+        self.batch_combined_arr = np.zeros((num_threads, MAX_POOLED_BATCH, 1024), dtype=np.float32)
+        self.batch_hidden_arr = np.zeros((num_threads, MAX_POOLED_BATCH, 16), dtype=np.float32)
+        self.batch_combined = <float*>cnp.PyArray_DATA(self.batch_combined_arr)
+        self.batch_hidden = <float*>cnp.PyArray_DATA(self.batch_hidden_arr)
+
+    cdef int _check_tid(self, int tid) except -1:
+        if tid < 0 or tid >= self.num_threads:
+            raise ValueError(f"tid must be in [0, {self.num_threads}), got {tid}")
+        return 0
+
+    cpdef float forward(self, tokens, int tid=0):
         # GIL-held here (Python-called); validate/convert to memoryview
         if not isinstance(tokens, np.ndarray) or tokens.dtype != np.int32:
             raise ValueError("tokens must be int32 ndarray")
         if tokens.shape[0] != 64:
             raise ValueError(f"tokens shape must be (64,), got {tokens.shape}")
+        self._check_tid(tid)
         cdef cnp.ndarray[cnp.int32_t, ndim=1] tok_arr = tokens
         cdef int[::1] tok_view = tok_arr  # Contiguous memoryview
-        return self._forward(tok_view)
+        cdef AttnScratch* s = &self.scratch[tid]
+        cdef int i
+        # Copy tokens from memoryview to C array (nogil-safe)
+        for i in range(64):
+            s.tokens[i] = tok_view[i]
+        return self._forward(s.tokens, s)
 
-    cdef float _forward(self, int[::1] tokens) noexcept nogil:
+    cpdef cnp.ndarray forward_batch(self, tokens_batch, int tid=0):
+        """
+        Batched forward: tokens_batch (N, 64) int32 → (N,) float32 logits.
+        Attention runs per position; the 1024→16 head runs as one (N×1024)·(1024×16) GEMM.
+        """
+        if not isinstance(tokens_batch, np.ndarray) or tokens_batch.dtype != np.int32:
+            raise ValueError("tokens_batch must be int32 ndarray")
+        if tokens_batch.ndim != 2 or tokens_batch.shape[1] != 64:
+            raise ValueError(f"tokens_batch shape must be (N, 64), got {tokens_batch.shape}")
+        self._check_tid(tid)
+        cdef int n = tokens_batch.shape[0]
+        cdef int[:, ::1] tok_view = np.ascontiguousarray(tokens_batch)
+        cdef cnp.ndarray[cnp.float32_t, ndim=1] out = np.empty(n, dtype=np.float32)
+        if n == 0:
+            return out
+        cdef float[::1] out_view = out
+        cdef float[:, ::1] combined
+        cdef float[:, ::1] hidden
+        if n <= MAX_POOLED_BATCH:
+            self._forward_pooled(&tok_view[0, 0], n, tid, &out_view[0])
+        else:
+            combined = np.empty((n, 1024), dtype=np.float32)
+            hidden = np.empty((n, 16), dtype=np.float32)
+            self._forward_batch(&tok_view[0, 0], n, &self.scratch[tid], &combined[0, 0], &hidden[0, 0], &out_view[0])
+        return out
+
+    @property
+    def native_batch_eval(self):
+        """
+        PyCapsule ("attn_model.batch_eval") of a C batch evaluator, for Board.set_native_batch_eval:
+        void fn(void* model, const int* tokens, int n, int tid, float* out), n <= 256, nogil.
+        """
+        return PyCapsule_New(<void*>_native_batch_eval, b"attn_model.batch_eval", NULL)
+
+    cdef void _forward_pooled(self, const int* tokens, int batch, int tid, float* out) noexcept nogil:
+        """_forward_batch on thread slot tid's pooled buffers (batch <= MAX_POOLED_BATCH)."""
+        if batch == 1:
+            # bs=1 specialization (single leaf evals, 1-capture quiescence nodes): no batch strides/GEMM
+            out[0] = self._forward(tokens, &self.scratch[tid])
+            return
+        self._forward_batch(tokens, batch, &self.scratch[tid],
+                            self.batch_combined + <Py_ssize_t>tid * MAX_POOLED_BATCH * 1024,
+                            self.batch_hidden + <Py_ssize_t>tid * MAX_POOLED_BATCH * 16, out)
+
+    cdef float _forward(self, const int* tokens, AttnScratch* s) noexcept nogil:
         """
         Optimized forward: nogil, unrolled loops, fixed C arrays for ~5-10x speedup over base.
-        tokens: contiguous int[::1] memoryview (64 elements, token IDs 0-959)
+        tokens: 64 token IDs (0-959); s: the calling thread's scratch
         Returns: float logit (scalar)
         """
-        cdef int i, j, m, n, tid
-        cdef float sum_qk, max_attn, exp_sum, temp, exp_temp
-        
-        # Copy tokens from memoryview to C array (nogil-safe)
-        for i in range(64):
-            self.tokens_c[i] = tokens[i]
+        cdef int n
+        cdef float temp
 
-        for i in range(64):
-            tid = self.tokens_c[i]
-            # q: 0:4 (unrolled)
-            self.q_flat[i*4 + 0] = self.embed_flat[tid*24 + 0]
-            self.q_flat[i*4 + 1] = self.embed_flat[tid*24 + 1]
-            self.q_flat[i*4 + 2] = self.embed_flat[tid*24 + 2]
-            self.q_flat[i*4 + 3] = self.embed_flat[tid*24 + 3]
-            # k: 4:8 (unrolled)
-            self.k_flat[i*4 + 0] = self.embed_flat[tid*24 + 4]
-            self.k_flat[i*4 + 1] = self.embed_flat[tid*24 + 5]
-            self.k_flat[i*4 + 2] = self.embed_flat[tid*24 + 6]
-            self.k_flat[i*4 + 3] = self.embed_flat[tid*24 + 7]
-            # v: 8:16 (loop for 8; unroll if desired, but compiler may auto)
-            for j in range(8):
-                self.v_flat[i*8 + j] = self.embed_flat[tid*24 + 8 + j]
-            # e: 16:24 (loop)
-            for j in range(8):
-                self.e_flat[i*8 + j] = self.embed_flat[tid*24 + 16 + j]
+        self._features(tokens, s.combined, s)
         
-        # attn = q @ k.T / 2.0 (unroll inner dim=4 dot product)
-        for i in range(64):
-            for j in range(64):
-                sum_qk = (self.q_flat[i*4 + 0] * self.k_flat[j*4 + 0] +
-                            self.q_flat[i*4 + 1] * self.k_flat[j*4 + 1] +
-                            self.q_flat[i*4 + 2] * self.k_flat[j*4 + 2] +
-                            self.q_flat[i*4 + 3] * self.k_flat[j*4 + 3])
-                self.attn_flat[i*64 + j] = sum_qk * 0.5  # Use float literal for precision
-        
-        # Softmax (per row; log-sum-exp for stability)
-        for i in range(64):
-            max_attn = self.attn_flat[i*64 + 0]
-            for j in range(1, 64):
-                if self.attn_flat[i*64 + j] > max_attn:
-                    max_attn = self.attn_flat[i*64 + j]
-            exp_sum = 0.0
-            for j in range(64):
-                exp_temp = self.attn_flat[i*64 + j] - max_attn
-                exp_temp = expf(exp_temp)
-                self.attn_flat[i*64 + j] = exp_temp
-                exp_sum += exp_temp
-            if exp_sum > 0.0:
-                for j in range(64):
-                    self.attn_flat[i*64 + j] /= exp_sum
-            else:
-                # Fallback to uniform (better than all-zero; avoids NaN propagation)
-                for j in range(64):
-                    self.attn_flat[i*64 + j] = 1.0 / 64.0
-        
-        # z = attn @ v [64,8] (loop; 64x64x8 ops)
-        for i in range(64):
-            for n in range(8):
-                temp = 0.0
-                for j in range(64):
-                    temp += self.attn_flat[i*64 + j] * self.v_flat[j*8 + n]
-                self.z_flat[i*8 + n] = temp
-        
-        # combined = cat(z, e) [64,16] (loop over 8)
-        for i in range(64):
-            for j in range(8):
-                self.combined_flat[i*16 + j] = self.z_flat[i*8 + j]
-                self.combined_flat[i*16 + 8 + j] = self.e_flat[i*8 + j]
-        
-        # h = ReLU(head(combined_flat) + bias) [16] (1024x16 ops)
-        for n in range(16):  # Use 'n' to avoid shadowing
-            temp = self.head_b_flat[n]
-            for m in range(1024):
-                temp += self.combined_flat[m] * self.head_w_flat[m * 16 + n]
-            self.h_flat[n] = fmaxf(0.0, temp)
+        # h = ReLU(head(combined) + bias) [16] (1024x16 ops)
+        if self.quantized:
+            head_int8(s.combined, self.head_wq_flat, self.head_scale_flat, self.head_b_flat, s.h)
+        else:
+            head_gemv_f32(s.combined, self.head_w_flat, self.head_b_flat, s.h)
         
         # value = out(h) + bias (loop over 16)
         temp = self.out_b_flat[0]
         for n in range(16):
-            temp += self.h_flat[n] * self.out_w_flat[n]
-        self.value = temp
-        return self.value
\ No newline at end of file
+            temp += s.h[n] * self.out_w_flat[n]
+        return temp
+
+    cdef void _forward_batch(self, const int* tokens, int batch, AttnScratch* s, float* combined, float* hidden,
+                             float* out) noexcept nogil:
+        """
+        tokens: (batch, 64) contiguous; combined: (batch, 1024) and hidden: (batch, 16) scratch.
+        The float head runs as one (batch×1024)·(1024×16) GEMM, 4 positions per weight pass.
+        """
+        cdef int b, n
+        cdef float temp
+
+        for b in range(batch):
+            self._features(tokens + b * 64, combined + b * 1024, s)
+
+        if self.quantized:
+            for b in range(batch):
+                head_int8(combined + b * 1024, self.head_wq_flat, self.head_scale_flat, self.head_b_flat, hidden + b * 16)
+        else:
+            head_gemm_f32(batch, combined, self.head_w_flat, self.head_b_flat, hidden)
+
+        # out = hidden @ out_w + bias [batch] (hidden is post-ReLU)
+        for b in range(batch):
+            temp = self.out_b_flat[0]
+            for n in range(16):
+                temp += hidden[b * 16 + n] * self.out_w_flat[n]
+            out[b] = temp
+
+    cdef void _features(self, const int* tokens, float* combined, AttnScratch* s) noexcept nogil:
+        """Embedding + sliced attention for one position: tokens[64] → combined = cat(z, e) [1024]."""
+        cdef int i, j, n
+        cdef const float* row
+        cdef float q[4]
+
+        # Gather: K transposed [4,64], V [64,8]; residual e goes straight into combined[:, 8:16]
+        for j in range(64):
+            row = &self.embed_flat[tokens[j] * 24]
+            s.kt[0*64 + j] = row[4]
+            s.kt[1*64 + j] = row[5]
+            s.kt[2*64 + j] = row[6]
+            s.kt[3*64 + j] = row[7]
+            for n in range(8):
+                s.v[j*8 + n] = row[8 + n]
+                combined[j*16 + 8 + n] = row[16 + n]
+
+        for i in range(64):
+            # q row with the 1/√4 = 0.5 scale folded in
+            row = &self.embed_flat[tokens[i] * 24]
+            q[0] = row[0] * 0.5
+            q[1] = row[1] * 0.5
+            q[2] = row[2] * 0.5
+            q[3] = row[3] * 0.5
+
+            # attn row = softmax(q·Kᵀ) [64]
+            qk_row(q, s.kt, s.attn_row)
+            softmax64(s.attn_row)
+
+            # z = attn row · V [8], written straight into combined[i, 0:8]
+            pv_row(s.attn_row, s.v, &combined[i*16])
+
+
+cdef void _native_batch_eval(void* model, const int* tokens, int n, int tid, float* out) noexcept nogil:
+    (<AttnModelCompiled>model)._forward_pooled(tokens, n, tid, out)
@@ -9,12 +9,27 @@
 # cython: overflowcheck=False
 # cython: embedsignature=True
 
-from libc.stdint cimport uint64_t, uint8_t, uint16_t, int8_t, int16_t
+from libc.stdint cimport uint64_t, uint8_t, uint16_t, int8_t, int16_t, int32_t
 from libc.math cimport INFINITY
 import random
 import numpy as np
 cimport numpy as cnp
-from libc.stdlib cimport qsort
+from libc.stdlib cimport qsort, malloc, calloc, free
+from libc.string cimport memcpy, memset
+from cpython.pycapsule cimport PyCapsule_GetPointer
+from cython.parallel cimport prange, threadid
+
+# OpenMP is optional (setup.py probes the compiler): without it prange runs serially on one thread
+cdef extern from *:
+    """
+    #ifdef _OPENMP
+    #include <omp.h>
+    static int cychess_max_threads(void) { return omp_get_max_threads(); }
+    #else
+    static int cychess_max_threads(void) { return 1; }
+    #endif
+    """
+    int cychess_max_threads() noexcept nogil
 
 # Piece constants (C-level)
 cdef public uint8_t PIECE_NONE = 0
@@ -35,6 +50,15 @@ PROMO_PIECES[1][0] = PIECE_BQ; PROMO_PIECES[1][1] = PIECE_BN; PROMO_PIECES[1][2]
 cdef int8_t PIECE_VALUES[6]
 PIECE_VALUES[:] = [1, 3, 3, 5, 9, 0]
 
+# Move ordering: every capture (MVV-LVA) ranks above every quiet move, promotions above both
+cdef enum:
+    MVV_LVA_BASE = 1000
+
+# Quiet-move ordering in search: killers first, then history (saturating below the killer scores)
+cdef enum:
+    HISTORY_MAX = 1 << 20
+    KILLER_SCORE = HISTORY_MAX + 2
+
 # Knight Deltas
 cdef int KNIGHT_DELTAS[8]
 KNIGHT_DELTAS[:] = [15, 17, 10, 6, -6, -10, -17, -15]
@@ -70,6 +94,7 @@ cdef uint64_t ZOBRIST_EP[65]
 
 cpdef void init_zobrist():
     """Init Zobrist tables with random 64-bit keys (call once after import)."""
+    global ZOBRIST_SIDE
     cdef int sq, pt, c
     random.seed(42)  # Reproducible (optional; change for variety)
     for sq in range(64):
@@ -83,43 +108,45 @@ cpdef void init_zobrist():
 
 init_zobrist()  # Auto-init on module load
 
+# Token ids (see Board.tokenize): TOKEN_LUT[code][sq] = sq * 15 + code; row 0 is the empty board
+cdef int32_t TOKEN_LUT[15][64]
+for _code in range(15):
+    for _sq in range(64):
+        TOKEN_LUT[_code][_sq] = _sq * 15 + _code
+# Piece code of bitboard i (kings: with castling rights; +1 without)
+cdef int TOKEN_CODE[12]
+TOKEN_CODE[:] = [1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13]
+
 # Flip Squares
 cdef inline int flip_sq(int sq) noexcept nogil:
     """Mirror square vertically for black PST lookup: a1<->a8, etc."""
     return ((sq & 7) | ((7 - (sq >> 3)) << 3))
 
+# Hardware bit scan / popcount (tzcnt/bsf, popcnt) with MSVC intrinsics fallback
+cdef extern from *:
+    """
+    #include <stdint.h>
+    #if defined(_MSC_VER)
+    #include <intrin.h>
+    static inline int cychess_ctz64(uint64_t bb) { unsigned long i; _BitScanForward64(&i, bb); return (int)i; }
+    static inline int cychess_popcnt64(uint64_t bb) { return (int)__popcnt64(bb); }
+    #else
+    static inline int cychess_ctz64(uint64_t bb) { return __builtin_ctzll(bb); }
+    static inline int cychess_popcnt64(uint64_t bb) { return __builtin_popcountll(bb); }
+    #endif
+    """
+    int cychess_ctz64(uint64_t bb) noexcept nogil
+    int cychess_popcnt64(uint64_t bb) noexcept nogil
+
 cdef inline int lsb_sq(uint64_t bb) noexcept nogil:
-    """Portable LSB (ctzll): position of lowest set bit (-1 if bb==0)."""
+    """LSB (ctzll): position of lowest set bit (-1 if bb==0)."""
     if bb == 0:
         return -1
-    cdef int r = 0
-    if (bb & 0xFFFFFFFFULL) == 0:
-        bb >>= 32
-        r += 32
-    if (bb & 0xFFFFULL) == 0:
-        bb >>= 16
-        r += 16
-    if (bb & 0xFFULL) == 0:
-        bb >>= 8
-        r += 8
-    if (bb & 0xFULL) == 0:
-        bb >>= 4
-        r += 4
-    if (bb & 0x3ULL) == 0:
-        bb >>= 2
-        r += 2
-    if (bb & 0x1ULL) == 0:
-        bb >>= 1
-        r += 1
-    return r
+    return cychess_ctz64(bb)
 
 cdef inline int popcnt(uint64_t bb) noexcept nogil:
-    """Portable popcountll (bit count)."""
-    cdef int r = 0
-    while bb:
-        bb &= bb - 1
-        r += 1
-    return r
+    """popcountll (bit count)."""
+    return cychess_popcnt64(bb)
 
 # PeSTO midgame PST tables (positional deltas, sq 0=a1 to 63=h8)
 cdef int16_t MG_PAWN[64]
@@ -200,6 +227,22 @@ MG_TABLES[5] = MG_KING
 cdef int16_t MATERIAL_MG[6]
 MATERIAL_MG[:] = [82, 337, 365, 477, 1025, 0]
 
+# Search score bounds (single precision): SCORE_INF is the full window and the unplayable-move
+# sentinel, SCORE_MATE the game-over score; both well inside float range, so no inf ever reaches nogil code
+cdef float SCORE_INF = 1e9
+cdef float SCORE_MATE = 1e8
+
+# Quiescence search: default capture-extension plies, and delta-pruning margin (centipawns, PST eval only)
+cdef enum:
+    MAX_SEARCH_DEPTH = 50  # Per-depth move buffers in Board (search/perft depth must stay below)
+    QS_MAX_PLY = 8
+    QS_DELTA_MARGIN = 200
+
+# Null-move pruning: depth reduction R, and the shallowest depth it is tried at
+cdef enum:
+    NULL_MOVE_R = 2
+    NULL_MOVE_MIN_DEPTH = 3
+
 # Free inline functions (pure C, GIL-free)
 cdef inline uint64_t sq_to_bit(int sq) noexcept nogil:
     return 1ULL << sq
@@ -224,6 +267,10 @@ cpdef int alg_to_square(str alg):
         return rank * 8 + file
     return -1
 
+# Python-side lookups for formatting/parsing many moves: one index/dict get instead of a call
+SQ_ALG = tuple(square_to_alg(sq) for sq in range(64))
+ALG_SQ = {alg: sq for sq, alg in enumerate(SQ_ALG)}
+
 cdef inline bint is_promo_rank(int sq, uint8_t side) noexcept nogil:
     return (side == 0 and (sq // 8) == 7) or (side == 1 and (sq // 8) == 0)
 
@@ -257,6 +304,95 @@ cdef struct UndoState:
     int8_t castle_rook_fr
     uint16_t halfmove
     uint16_t fullmove
+    uint64_t hash
+
+# Transposition table bound flags
+cdef enum:
+    TT_EXACT = 0
+    TT_LOWER = 1
+    TT_UPPER = 2
+
+cdef struct TTEntry:
+    uint64_t key
+    float score
+    int8_t depth
+    uint8_t flag
+    uint16_t move   # Best/refutation move: fr | to << 6 | promo << 12 (0 = none)
+
+# NumPy mirror of TTEntry (aligned, 16 bytes per entry)
+TT_DTYPE = np.dtype([('key', 'u8'), ('score', 'f4'), ('depth', 'i1'), ('flag', 'u1'), ('move', 'u2')], align=True)
+
+cdef inline uint64_t tt_data(const TTEntry* e) noexcept nogil:
+    """The 8 payload bytes after key (score, depth, flag, move) as one word."""
+    cdef uint64_t data
+    memcpy(&data, &e.score, sizeof(uint64_t))
+    return data
+
+# Native batched evaluator (e.g. AttnModelCompiled.native_batch_eval): scores n token rows
+# into out (white-relative) using scratch slot tid; called without the GIL
+ctypedef void (*native_batch_eval_fn)(void* ctx, const int32_t* tokens, int n, int tid, float* out) noexcept nogil
+
+cdef inline uint16_t pack_move(Move move) noexcept nogil:
+    return <uint16_t>(move.fr_sq | (move.to_sq << 6) | (move.promo << 12))
+
+cdef class TranspositionTable:
+    """
+    Direct-mapped transposition table keyed by Zobrist hash (idx = key & (size - 1)).
+    Storage is a fixed-size NumPy array of TT_DTYPE; always-replace policy.
+    Owned by an engine and attached to boards via Board.set_tt() so it survives across moves.
+    Keys are stored XORed with the payload word, so a probe racing a store from another
+    search thread sees a key mismatch instead of a torn entry (lockless sharing).
+    """
+    cdef object entries
+    cdef TTEntry* table
+    cdef uint64_t mask
+
+    def __init__(self, int size_log2 = 20):
+        if sizeof(TTEntry) != TT_DTYPE.itemsize:
+            raise ValueError(f"TTEntry size mismatch: {sizeof(TTEntry)} != {TT_DTYPE.itemsize}")
+        self.entries = np.zeros(1 << size_log2, dtype=TT_DTYPE)
+        self.table = <TTEntry*>cnp.PyArray_DATA(self.entries)
+        self.mask = (1ULL << size_log2) - 1
+
+    cpdef void clear(self):
+        self.entries.fill(0)
+
+    @property
+    def size(self):
+        return self.mask + 1
+
+cdef struct OrderTables:
+    uint16_t killers[MAX_SEARCH_DEPTH + 1][2]   # Last two quiet cutoff moves per ply from the root
+    int history[64][64]                         # Sum of depth^2 over quiet cutoffs, by from/to
+
+cdef class MoveHistory:
+    """
+    Quiet-move ordering tables for search: two killer moves per ply from the root and a from/to
+    history of depth^2 over quiet beta cutoffs.
+    Owned by an engine and attached via Board.set_move_history(), like TranspositionTable, so
+    per-thread clones, iterative-deepening passes and successive moves share what was learned.
+    Threads update it unsynchronized; a lost or torn update only perturbs move order.
+    """
+    cdef OrderTables* tables
+
+    def __cinit__(self):
+        self.tables = <OrderTables*>calloc(1, sizeof(OrderTables))
+        if self.tables == NULL:
+            raise MemoryError()
+
+    def __dealloc__(self):
+        free(self.tables)
+
+    cpdef void clear(self):
+        memset(self.tables, 0, sizeof(OrderTables))
+
+    cpdef void age(self):
+        """Between moves: halve history so old cutoffs fade, and drop the position-specific killers."""
+        cdef int i, j
+        for i in range(64):
+            for j in range(64):
+                self.tables.history[i][j] >>= 1
+        memset(self.tables.killers, 0, sizeof(self.tables.killers))
 
 cdef class Board:
     # Board state
@@ -274,29 +410,128 @@ cdef class Board:
     cdef UndoState undo_stack[1024]
     cdef int undo_index  # In __cinit__: self.undo_index = 0
 
-    cdef Move move_cache[50][256]
-    cdef int move_count_cache[50]
+    cdef Move move_cache[MAX_SEARCH_DEPTH][256]
+    cdef int move_count_cache[MAX_SEARCH_DEPTH]
+
+    # Quiet-move ordering tables (borrowed from history_owner; search() attaches one if unset)
+    cdef object history_owner
+    cdef OrderTables* order
 
     # For remembering if moves is currently legal moves
     cdef bint legal_valid
 
-    # Eval func
-    cdef object eval_func
-
-    cdef int eval_count
-    cdef int pst_sign
+    # Batched leaf eval: (N, 64) int32 tokens → (N,) scores
+    cdef object batch_eval_func
+    cdef bint has_batch_eval
+    cdef object batch_tokens_arr
+    cdef int32_t* batch_tokens
+    cdef float batch_scores[256]
+
+    # Native evaluator (GIL-free); ctx is borrowed from batch_eval_func
+    cdef native_batch_eval_fn native_eval
+    cdef void* native_ctx
+    cdef int eval_slots     # Scratch slots the native evaluator has (max search threads)
+    cdef int eval_tid       # Slot used by this board's search
+    cdef bint eval_failed   # Python evaluator raised or misbehaved: search unwinds, search() re-raises
+    cdef object eval_error
+
+    cdef long long eval_count   # Leaf evals since the last reset_eval_count()
+    cdef int qs_max_ply
+    cdef bint after_null    # Set while searching the reply to a null move (no two passes in a row)
+    cdef int ply            # Plies below the search root (killer index); set by search()/root_parallel_search
+
+    # Zobrist hash (maintained incrementally by make/undo)
+    cdef uint64_t hash
+
+    # Transposition table (borrowed from tt_owner)
+    cdef object tt_owner
+    cdef TTEntry* tt_table
+    cdef uint64_t tt_mask
 
     def __cinit__(self):
         self._clear()
         self.undo_index = 0
         self.legal_valid = False
-        self.pst_sign = 1
+        self.qs_max_ply = QS_MAX_PLY
+        self.after_null = False
+        self.tt_table = NULL
+        self.has_batch_eval = False
+        self.native_eval = NULL
+        self.eval_tid = 0
+
+    cpdef void set_batch_eval_func(self, object batch_eval_func):
+        """
+        Leaf evaluator for search: called once per frontier node with the tokens of all
+        children ((N, 64) int32) and returning (N,) white-relative scores (the board flips
+        them to the side to move). None falls back to PST eval.
+        """
+        self.batch_eval_func = batch_eval_func
+        self.has_batch_eval = batch_eval_func is not None
+        self.native_eval = NULL
+        self.native_ctx = NULL
+        self._alloc_batch_buffers()
+
+    cpdef void set_native_batch_eval(self, object model, int slot = 0):
+        """
+        Like set_batch_eval_func, but calls the model's C evaluator directly (model.native_batch_eval
+        capsule), so search never takes the GIL. model.num_threads bounds parallel root search.
+        slot is the model scratch slot this board's search() uses: boards searching concurrently
+        on one model need distinct slots in [0, model.num_threads).
+        """
+        if model is None:
+            self.set_batch_eval_func(None)
+            return
+        if slot < 0 or slot >= model.num_threads:
+            raise ValueError(f"slot must be in [0, {model.num_threads}), got {slot}")
+        cdef void* fn = PyCapsule_GetPointer(model.native_batch_eval, b"attn_model.batch_eval")
+        self.batch_eval_func = model
+        self.has_batch_eval = True
+        self.native_eval = <native_batch_eval_fn>fn
+        self.native_ctx = <void*>model
+        self.eval_slots = model.num_threads
+        self.eval_tid = slot
+        self._alloc_batch_buffers()
+
+    cdef void _alloc_batch_buffers(self):
+        if self.has_batch_eval and self.batch_tokens_arr is None:
+            self.batch_tokens_arr = np.empty((256, 64), dtype=np.int32)
+            self.batch_tokens = <int32_t*>cnp.PyArray_DATA(self.batch_tokens_arr)
+
+    cdef void _copy_search_setup(self, Board other):
+        """Share other's TT and leaf evaluator (for per-thread clones)."""
+        self.set_tt(other.tt_owner)
+        self.set_move_history(other.history_owner)
+        self.batch_eval_func = other.batch_eval_func
+        self.has_batch_eval = other.has_batch_eval
+        self.native_eval = other.native_eval
+        self.native_ctx = other.native_ctx
+        self.eval_slots = other.eval_slots
+        self._alloc_batch_buffers()
+
+    cpdef void set_tt(self, TranspositionTable tt):
+        """Attach a transposition table to search (None detaches)."""
+        self.tt_owner = tt
+        if tt is None:
+            self.tt_table = NULL
+            self.tt_mask = 0
+        else:
+            self.tt_table = tt.table
+            self.tt_mask = tt.mask
 
-    cpdef void set_eval_func(self, object eval_func):
-        self.eval_func = eval_func
+    cpdef void set_move_history(self, MoveHistory history):
+        """Attach killer/history move-ordering tables to search (None detaches)."""
+        self.history_owner = history
+        self.order = NULL if history is None else history.tables
 
-    cpdef void set_pst_sign(self, int pst_sign):
-        self.pst_sign = pst_sign
+    cdef void _ensure_move_history(self):
+        if self.order == NULL:
+            self.set_move_history(MoveHistory())
+
+    cpdef void set_qsearch_depth(self, int max_ply):
+        """Max capture plies searched past the horizon (0 = static eval at depth 0)."""
+        if max_ply < 0:
+            raise ValueError(f"max_ply must be >= 0, got {max_ply}")
+        self.qs_max_ply = max_ply
 
     cdef void _clear(self) noexcept nogil:
         cdef int i
@@ -308,6 +543,7 @@ cdef class Board:
         self.ep_square = -1
         self.halfmove = 0
         self.fullmove = 1
+        self.hash = self._compute_hash()
 
     cpdef void clear(self):
         self._clear()
@@ -351,6 +587,7 @@ cdef class Board:
         self.halfmove = 0
         self.fullmove = 1
         self._update_occupancy()
+        self.hash = self._compute_hash()
 
     cpdef void set_start_position(self):
         self._set_start_position()
@@ -419,12 +656,16 @@ cdef class Board:
         attacker_idx = (attacker_type - 1) % 6
         attacker_value = PIECE_VALUES[attacker_idx]
 
+        # En passant: the captured pawn isn't on to_sq
+        if attacker_idx == 0 and to_sq == self.ep_square and victim_type == PIECE_NONE:
+            return MVV_LVA_BASE + PIECE_VALUES[0] * 100 - attacker_value * 10
+
         if victim_type != PIECE_NONE:
             victim_opponent = (victim_type <= 6) != (attacker_type <= 6)
             if victim_opponent:
                 victim_idx = (victim_type - 1) % 6
                 victim_value = PIECE_VALUES[victim_idx]
-                score = victim_value * 100 - attacker_value * 10
+                score = MVV_LVA_BASE + victim_value * 100 - attacker_value * 10
                 if victim_value > attacker_value:
                     score += 50
             else:
@@ -869,15 +1110,15 @@ cdef class Board:
         if self.legal_valid and not force:
             return self.move_count
         cdef int pseudo_count = self.generate_pseudo_legal_moves()
-        cdef Move temp_moves[256]
         cdef int legal_count = 0
         cdef int i
+        cdef Move move
+        # Compact legal moves in place (legal_count <= i; make/undo never touch self.moves)
         for i in range(pseudo_count):
-            temp_moves[i] = self.moves[i]
-        for i in range(pseudo_count):
-            if self._make_move(temp_moves[i].fr_sq, temp_moves[i].to_sq, temp_moves[i].promo):
+            move = self.moves[i]
+            if self._make_move(move.fr_sq, move.to_sq, move.promo):
                 if not self._is_in_check(check_invalid=True):
-                    self.moves[legal_count] = temp_moves[i]
+                    self.moves[legal_count] = move
                     legal_count += 1
                 self._undo_move()
         self.move_count = legal_count
@@ -888,6 +1129,20 @@ cdef class Board:
     cpdef int generate_moves(self):
         return self.generate_legal_moves()
 
+    cdef int generate_moves_into(self, Move* out) noexcept nogil:
+        """Legal moves (MVV-LVA order) copied into a caller-owned buffer of 256; returns the count."""
+        cdef int n = self.generate_legal_moves()
+        if n > 0:
+            memcpy(out, &self.moves[0], n * sizeof(Move))
+        return n
+
+    cpdef tuple get_move(self, int index):
+        """The index-th legal move as (fr, to, promo), in get_moves_list() order, without building the list."""
+        cdef int n = self.generate_legal_moves()
+        if index < 0 or index >= n:
+            raise IndexError(f"move index {index} out of range for {n} legal moves")
+        return (self.moves[index].fr_sq, self.moves[index].to_sq, self.moves[index].promo)
+
     cpdef list get_pseudo_legals(self):
         self.generate_pseudo_legal_moves()
         cdef list result = []
@@ -908,6 +1163,21 @@ cdef class Board:
     cpdef list get_moves_list(self):
         return self._get_moves_list()
 
+    cdef int _generate_legal_captures(self, Move* out) noexcept nogil:
+        """Copy the legal captures (incl. en passant) and promotions into out, in MVV-LVA order."""
+        cdef uint64_t opp_occ = self.occupancy[1 if self.white_to_move else 0]
+        cdef uint64_t pawns_bb = self.pieces[PIECE_WP - 1 if self.white_to_move else PIECE_BP - 1]
+        cdef int i, count = 0
+        cdef Move move
+        self.generate_legal_moves()
+        for i in range(self.move_count):
+            move = self.moves[i]
+            if (move.promo != 0 or (opp_occ & sq_to_bit(move.to_sq)) or
+                    (move.to_sq == self.ep_square and (pawns_bb & sq_to_bit(move.fr_sq)))):
+                out[count] = move
+                count += 1
+        return count
+
     cdef void _set_piece(self, int sq, uint8_t piece_type) noexcept nogil:
         self.legal_valid = False
         if sq < 0 or sq >= 64:
@@ -930,7 +1200,8 @@ cdef class Board:
             self.occupancy[2] |= bit
 
     cpdef set_piece(self, int sq, uint8_t piece_type):
-        return self._set_piece(sq, piece_type)
+        self._set_piece(sq, piece_type)
+        self.hash = self._compute_hash()
 
     cdef bint _make_move(self, uint8_t fr_sq_, uint8_t to_sq_, uint8_t promo_) noexcept nogil:
         self.legal_valid = False
@@ -994,8 +1265,17 @@ cdef class Board:
         undo.castle_rook_fr = castle_rook_fr
         undo.halfmove = self.halfmove
         undo.fullmove = self.fullmove
+        undo.hash = self.hash
         self.undo_index += 1
 
+        # Zobrist: remove mover from fr, captures, and old castling/EP keys
+        cdef uint64_t h = self.hash ^ ZOBRIST_SIDE
+        h ^= ZOBRIST_PIECE[fr_sq][mover_type - 1]
+        if cap_type != PIECE_NONE:
+            h ^= ZOBRIST_PIECE[to_sq][cap_type - 1]
+        h ^= ZOBRIST_CASTLE[self.castling]
+        h ^= ZOBRIST_EP[64 if self.ep_square < 0 else self.ep_square]
+
         # Clear fr
         self.pieces[mover_type - 1] &= ~fr_bit
         self.occupancy[mover_side] &= ~fr_bit
@@ -1016,6 +1296,7 @@ cdef class Board:
         if ep_captured_sq != -1:
             ep_bit = sq_to_bit(ep_captured_sq)
             ep_cap_type = PIECE_BP if self.white_to_move else PIECE_WP
+            h ^= ZOBRIST_PIECE[ep_captured_sq][ep_cap_type - 1]
             self.pieces[ep_cap_type - 1] &= ~ep_bit
             ep_side = 1 - mover_side
             self.occupancy[ep_side] &= ~ep_bit
@@ -1030,6 +1311,7 @@ cdef class Board:
             rfr_bit = sq_to_bit(castle_rook_fr)
             rto_bit = sq_to_bit(rook_to)
             rook_type = PIECE_WR if mover_side == 0 else PIECE_BR
+            h ^= ZOBRIST_PIECE[castle_rook_fr][rook_type - 1] ^ ZOBRIST_PIECE[rook_to][rook_type - 1]
             self.pieces[rook_type - 1] &= ~rfr_bit
             self.occupancy[mover_side] &= ~rfr_bit
             self.occupancy[2] &= ~rfr_bit
@@ -1043,10 +1325,11 @@ cdef class Board:
         self.occupancy[2] |= to_bit
 
         # Promo override
-        cdef uint8_t new_type
+        cdef uint8_t new_type = mover_type
         if promo != 0:
             new_type = PROMO_PIECES[mover_side][promo - 1]
             self._set_piece(to_sq, new_type)
+        h ^= ZOBRIST_PIECE[to_sq][new_type - 1]
 
         # State updates
         self.white_to_move = not self.white_to_move
@@ -1077,9 +1360,35 @@ cdef class Board:
         if (self.pieces[PIECE_BK - 1] & sq_to_bit(60)) and (self.pieces[PIECE_BR - 1] & sq_to_bit(56)):
             self.castling |= CASTLE_BQ
 
+        # Zobrist: new castling/EP keys
+        h ^= ZOBRIST_CASTLE[self.castling]
+        h ^= ZOBRIST_EP[64 if self.ep_square < 0 else self.ep_square]
+        self.hash = h
+
         self._update_occupancy()
         return True
 
+    cdef int8_t _make_null_move(self) noexcept nogil:
+        """Pass the turn (search only): flip the side to move and clear en passant, hash kept in step.
+        Not recorded on the undo stack; returns the old ep square for _undo_null_move."""
+        cdef int8_t ep_square = self.ep_square
+        self.hash ^= ZOBRIST_SIDE ^ ZOBRIST_EP[64 if ep_square < 0 else ep_square] ^ ZOBRIST_EP[64]
+        self.ep_square = -1
+        self.white_to_move = not self.white_to_move
+        self.legal_valid = False
+        return ep_square
+
+    cdef void _undo_null_move(self, int8_t ep_square) noexcept nogil:
+        self.hash ^= ZOBRIST_SIDE ^ ZOBRIST_EP[64 if ep_square < 0 else ep_square] ^ ZOBRIST_EP[64]
+        self.ep_square = ep_square
+        self.white_to_move = not self.white_to_move
+        self.legal_valid = False
+
+    cdef bint _has_non_pawn_material(self) noexcept nogil:
+        """Side to move has a knight, bishop, rook or queen (null-move zugzwang guard)."""
+        cdef int base = PIECE_WN - 1 if self.white_to_move else PIECE_BN - 1
+        return (self.pieces[base] | self.pieces[base + 1] | self.pieces[base + 2] | self.pieces[base + 3]) != 0
+
     cpdef bint make_move(self, int fr_sq, int to_sq, uint8_t promo=0):
         return self._make_move(<uint8_t>fr_sq, <uint8_t>to_sq, promo)
 
@@ -1169,6 +1478,7 @@ cdef class Board:
         self.ep_square = undo.ep_square
         self.halfmove = undo.halfmove
         self.fullmove = undo.fullmove
+        self.hash = undo.hash
         self.white_to_move = not self.white_to_move
 
         self._update_occupancy()
@@ -1200,7 +1510,7 @@ cdef class Board:
                 flip = flip_sq(sq)
                 score -= MATERIAL_MG[ptype] + MG_TABLES[ptype][flip]
                 bb &= bb - 1
-        return score * self.pst_sign
+        return score
 
     cpdef int eval_pst(self):
         """Naive PST + material evaluation (centipawns, positive = white advantage)."""
@@ -1218,14 +1528,11 @@ cdef class Board:
         return self._material_balance()
 
     cpdef long long perft(self, int depth):
+        if depth < 0 or depth >= MAX_SEARCH_DEPTH:
+            raise ValueError(f"depth must be in [0, {MAX_SEARCH_DEPTH}), got {depth}")
         if depth == 0:
             return 1
-        self.generate_legal_moves()
-        
-        cdef int j
-        for j in range(self.move_count):
-            self.move_cache[depth][j] = self.moves[j]
-        self.move_count_cache[depth] = self.move_count
+        self.move_count_cache[depth] = self.generate_moves_into(self.move_cache[depth])
         cdef long long nodes = 0
         cdef int i
         for i in range(self.move_count_cache[depth]):
@@ -1294,14 +1601,15 @@ cdef class Board:
         new_board.ep_square = self.ep_square
         new_board.halfmove = self.halfmove
         new_board.fullmove = self.fullmove
+        new_board.hash = self.hash
         new_board.undo_index = 0
         new_board.move_count = 0
-        new_board.pst_sign = self.pst_sign
+        new_board.qs_max_ply = self.qs_max_ply
         # Caches reset in __cinit__
         return new_board
 
-    # Inside Board class (add these)
-    cdef uint64_t _zobrist_hash(self) noexcept nogil:
+    cdef uint64_t _compute_hash(self) noexcept nogil:
+        """Full Zobrist recompute (used on setup; make/undo update incrementally)."""
         cdef uint64_t h = 0
         cdef int sq, pt
         cdef uint64_t bb
@@ -1322,8 +1630,8 @@ cdef class Board:
         return h
 
     cpdef uint64_t zobrist_hash(self):
-        """Python-accessible board hash for TT/eval cache."""
-        return self._zobrist_hash()
+        """Python-accessible board hash for TT/eval cache (incremental, O(1))."""
+        return self.hash
 
     cpdef void print_board(self):
         """Print an ASCII representation of the board (ranks 8-1 top to bottom, files a-h left to right).
@@ -1371,53 +1679,350 @@ cdef class Board:
         print("  a b c d e f g h")
         print(f"Turn: {'White' if self.white_to_move else 'Black'} | Castling: {self.castling} | EP: {self.ep_square if self.ep_square >= 0 else 'none'} | Halfmove: {self.halfmove} | Fullmove: {self.fullmove}")
 
-    cdef double _eval(self) noexcept nogil:
-        return <double>self._eval_pst()
+    cdef float _eval(self) noexcept nogil:
+        """Static eval from the side to move's point of view (negamax convention)."""
+        cdef float score
+        if self.has_batch_eval:
+            self._tokenize_into(self.batch_tokens)
+            self._run_batch_eval(1)
+            score = self.batch_scores[0]
+        else:
+            score = <float>self._eval_pst()
+        self.eval_count += 1
+        return score if self.white_to_move else -score
+
+    cdef void _run_batch_eval(self, int n) noexcept nogil:
+        """Score the first n rows of batch_tokens into batch_scores (one native or Python call)."""
+        cdef float[::1] scores
+        cdef int i
+        if self.native_eval != NULL:
+            self.native_eval(self.native_ctx, self.batch_tokens, n, self.eval_tid, self.batch_scores)
+            return
+        with gil:
+            try:
+                scores = np.asarray(self.batch_eval_func(self.batch_tokens_arr[:n]), dtype=np.float32).reshape(-1)
+                if scores.shape[0] != n:
+                    raise ValueError(f"batch eval returned {scores.shape[0]} scores for {n} positions")
+                for i in range(n):
+                    self.batch_scores[i] = scores[i]
+            except BaseException as e:
+                self.eval_failed = True
+                self.eval_error = e
+
+    cdef void _raise_eval_error(self) except *:
+        """Re-raise (and clear) an error recorded by _run_batch_eval during a nogil search."""
+        cdef object error
+        if self.eval_failed:
+            error = self.eval_error
+            self.eval_failed = False
+            self.eval_error = None
+            raise error
+
+    cdef void _eval_children(self, Move* moves, int n) noexcept nogil:
+        """
+        Batched leaf eval of all children: batch_scores[i] = eval after moves[i], from the
+        child's side to move (i.e. the opponent of the side moving here).
+        """
+        cdef int i, j, count = 0
+        cdef int idx[256]
+        for i in range(n):
+            if self._make_move(moves[i].fr_sq, moves[i].to_sq, moves[i].promo):
+                self._tokenize_into(self.batch_tokens + count * 64)
+                self._undo_move()
+                idx[count] = i
+                count += 1
+        if count > 0:
+            self._run_batch_eval(count)
+            if self.white_to_move:
+                for i in range(count):
+                    self.batch_scores[i] = -self.batch_scores[i]
+        self.eval_count += count
+        # Scatter back to move order (in place, idx[i] >= i); unplayable moves can never raise alpha
+        j = n - 1
+        for i in range(count - 1, -1, -1):
+            while j > idx[i]:
+                self.batch_scores[j] = SCORE_INF
+                j -= 1
+            self.batch_scores[j] = self.batch_scores[i]
+            j -= 1
+        while j >= 0:
+            self.batch_scores[j] = SCORE_INF
+            j -= 1
+
+    cdef float _qsearch(self, float alpha, float beta, int ply, float stand_pat) noexcept nogil:
+        """
+        Quiescence search: extend captures/promotions until the position is quiet.
+        stand_pat is this position's static eval (side to move), computed by the caller so
+        that batched evaluators can score all capture children in one call. In check there is
+        no standing pat: every evasion is searched, and none means mate. Fail-soft.
+        """
+        if self.eval_failed:
+            return 0
+        if ply >= self.qs_max_ply:
+            return stand_pat
+
+        cdef Move captures[256]
+        cdef float child_evals[256]
+        cdef bint in_check = self._is_in_check()
+        cdef float best
+        cdef int n
+        cdef int j
+        cdef Move move
+        cdef uint8_t victim
+        cdef float score
+
+        if in_check:
+            n = self.generate_moves_into(captures)
+            if n == 0:
+                return -SCORE_MATE
+            best = -SCORE_MATE
+        else:
+            best = stand_pat
+            if best >= beta:
+                return best
+            n = self._generate_legal_captures(captures)
+        if best > alpha:
+            alpha = best
+
+        # Prune before searching (and, with a batched evaluator, before scoring) the captures:
+        # losing captures, a defended victim worth less than the attacker, with any evaluator; and
+        # with PST eval, delta pruning: captures that can't lift alpha even with a free victim
+        cdef int count = 0
+        cdef uint8_t attacker
+        if not in_check:
+            for j in range(n):
+                move = captures[j]
+                if move.promo == 0:
+                    victim = self._get_piece_at(move.to_sq)
+                    if victim != PIECE_NONE:  # En passant (pawn takes pawn) is never losing
+                        attacker = self._get_piece_at(move.fr_sq)
+                        if (PIECE_VALUES[(victim - 1) % 6] < PIECE_VALUES[(attacker - 1) % 6] and
+                                self.square_attacked(move.to_sq, not self.white_to_move)):
+                            continue
+                    if not self.has_batch_eval:
+                        score = MATERIAL_MG[(victim - 1) % 6] if victim != PIECE_NONE else MATERIAL_MG[0]
+                        if stand_pat + score + QS_DELTA_MARGIN < alpha:
+                            continue
+                captures[count] = move
+                count += 1
+            n = count
+        if n == 0:
+            return best
+
+        if self.has_batch_eval:
+            self._eval_children(captures, n)
+            if self.eval_failed:
+                return 0
+            for j in range(n):
+                child_evals[j] = self.batch_scores[j]
+
+        for j in range(n):
+            move = captures[j]
+            if not self._make_move(move.fr_sq, move.to_sq, move.promo):
+                continue
+            if self.has_batch_eval:
+                score = -self._qsearch(-beta, -alpha, ply + 1, child_evals[j])
+            else:
+                score = -self._qsearch(-beta, -alpha, ply + 1, self._eval())
+            self._undo_move()
+            if self.eval_failed:
+                return 0
+            if score > best:
+                best = score
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        return best
+
+    cdef bint _is_quiet(self, Move move) noexcept nogil:
+        """Not a capture (incl. en passant) or promotion."""
+        if move.promo != 0 or (self.occupancy[2] & sq_to_bit(move.to_sq)):
+            return False
+        return not (move.to_sq == self.ep_square and
+                    (self.pieces[PIECE_WP - 1 if self.white_to_move else PIECE_BP - 1] & sq_to_bit(move.fr_sq)))
+
+    cdef void _order_quiets(self, Move* moves, int n) noexcept nogil:
+        """Re-rank the quiet tail of an MVV-LVA sorted move list: killers for this ply first, then by history."""
+        cdef int first = 0
+        cdef int j
+        cdef uint16_t packed
+        if self.order == NULL:
+            return
+        while first < n and moves[first].score >= MVV_LVA_BASE:
+            first += 1
+        for j in range(first, n):
+            packed = pack_move(moves[j])
+            if packed == self.order.killers[self.ply][0]:
+                moves[j].score = KILLER_SCORE
+            elif packed == self.order.killers[self.ply][1]:
+                moves[j].score = KILLER_SCORE - 1
+            else:
+                moves[j].score = self.order.history[moves[j].fr_sq][moves[j].to_sq]
+        if n - first > 1:
+            qsort(&moves[first], <size_t>(n - first), sizeof(Move), <CmpFunc>move_score_cmp)
 
-    cdef double _search(self, int depth, double alpha, double beta) noexcept nogil:
+    cdef void _record_cutoff(self, Move move, int depth) noexcept nogil:
+        """Quiet move caused a beta cutoff: make it a killer for this ply and bump its history by depth^2."""
+        if self.order == NULL:
+            return
+        cdef uint16_t packed = pack_move(move)
+        cdef int* h = &self.order.history[move.fr_sq][move.to_sq]
+        h[0] += depth * depth
+        if h[0] > HISTORY_MAX:
+            h[0] = HISTORY_MAX
+        if self.order.killers[self.ply][0] != packed:
+            self.order.killers[self.ply][1] = self.order.killers[self.ply][0]
+            self.order.killers[self.ply][0] = packed
+
+    cdef float _search(self, int depth, float alpha, float beta) noexcept nogil:
         cdef uint64_t key
-        cdef double eval_score
+        cdef bint after_null = self.after_null
+        self.after_null = False
 
+        if self.eval_failed:
+            return 0
         if depth == 0:
-            eval_score = self._eval()
-            self.eval_count += 1
-            return eval_score
+            return self._qsearch(alpha, beta, 0, self._eval())
+
+        # TT probe: reuse stored bound if searched at least as deep
+        cdef float alpha_orig = alpha
+        cdef TTEntry* entry = NULL
+        cdef TTEntry probe
+        cdef uint16_t tt_move = 0
+        if self.tt_table != NULL:
+            key = self.hash
+            entry = &self.tt_table[key & self.tt_mask]
+            probe = entry[0]  # Snapshot; the XOR check rejects entries torn by a concurrent store
+            if probe.key ^ tt_data(&probe) == key:
+                tt_move = probe.move
+                if probe.depth >= depth:
+                    if probe.flag == TT_EXACT:
+                        return probe.score
+                    elif probe.flag == TT_LOWER:
+                        if probe.score > alpha:
+                            alpha = probe.score
+                    elif probe.flag == TT_UPPER:
+                        if probe.score < beta:
+                            beta = probe.score
+                    if alpha >= beta:
+                        return probe.score
 
         cdef int game_result = self.game_result_nogil()
         if game_result != -2:
-            return 100000.0 * game_result
-        
-        self.generate_legal_moves()
+            return SCORE_MATE * game_result if self.white_to_move else -SCORE_MATE * game_result
 
         cdef Move move
-        cdef double score
-
-        cdef int j
-        for j in range(self.move_count):
-            self.move_cache[depth][j] = self.moves[j]
-        self.move_count_cache[depth] = self.move_count
+        cdef float score
+        cdef uint16_t best_move = tt_move
+        cdef float child_evals[256]
+        cdef int8_t null_ep
+
+        # Null-move pruning: if passing still fails high at reduced depth, a real move will too.
+        # Skipped in check, right after a pass, near mate bounds and with only pawns (zugzwang).
+        if (depth >= NULL_MOVE_MIN_DEPTH and not after_null and beta < SCORE_MATE
+                and self._has_non_pawn_material() and not self._is_in_check()):
+            null_ep = self._make_null_move()
+            self.after_null = True
+            self.ply += 1
+            score = -self._search(depth - 1 - NULL_MOVE_R, -beta, -beta + 1)
+            self.ply -= 1
+            self._undo_null_move(null_ep)
+            if self.eval_failed:
+                return 0
+            if score >= beta:
+                return beta
+
+        cdef int j, k
+        self.move_count_cache[depth] = self.generate_moves_into(self.move_cache[depth])
+        self._order_quiets(self.move_cache[depth], self.move_count_cache[depth])
+
+        # PV/TT move first, then captures (MVV-LVA), killers and quiets by history
+        if tt_move != 0:
+            for j in range(self.move_count_cache[depth]):
+                if pack_move(self.move_cache[depth][j]) == tt_move:
+                    move = self.move_cache[depth][j]
+                    for k in range(j, 0, -1):
+                        self.move_cache[depth][k] = self.move_cache[depth][k - 1]
+                    self.move_cache[depth][0] = move
+                    break
         
+        # Frontier node: evaluate all children in one batch
+        cdef bint batched = depth == 1 and self.has_batch_eval
+        if batched:
+            self._eval_children(self.move_cache[depth], self.move_count_cache[depth])
+            if self.eval_failed:
+                return 0
+            for j in range(self.move_count_cache[depth]):
+                child_evals[j] = self.batch_scores[j]
+
         for j in range(self.move_count_cache[depth]):
             move = self.move_cache[depth][j]
-            if self._make_move(move.fr_sq, move.to_sq, move.promo):
-                score = self._search(depth - 1, -beta, -alpha)
+            if batched:
+                if child_evals[j] == SCORE_INF:
+                    continue
+                if self.qs_max_ply == 0:
+                    score = -child_evals[j]
+                else:
+                    self._make_move(move.fr_sq, move.to_sq, move.promo)
+                    score = -self._qsearch(-beta, -alpha, 0, child_evals[j])
+                    self._undo_move()
+            elif self._make_move(move.fr_sq, move.to_sq, move.promo):
+                self.ply += 1
+                score = -self._search(depth - 1, -beta, -alpha)
+                self.ply -= 1
                 self._undo_move()
-            
-                score = -score
-                if score > alpha:
-                    alpha = score
-                if alpha > beta:
+            else:
+                continue
+            if self.eval_failed:
+                return 0  # Unwind without touching the TT
+
+            if score > alpha:
+                alpha = score
+                best_move = pack_move(move)
+                if alpha >= beta:
+                    if self._is_quiet(move):
+                        self._record_cutoff(move, depth)
                     break
+
+        # TT store (always replace)
+        if entry != NULL:
+            probe.score = alpha
+            probe.depth = <int8_t>depth
+            probe.move = best_move
+            if alpha <= alpha_orig:
+                probe.flag = TT_UPPER
+            elif alpha >= beta:
+                probe.flag = TT_LOWER
+            else:
+                probe.flag = TT_EXACT
+            probe.key = key ^ tt_data(&probe)
+            entry[0] = probe
         
         return alpha
 
-    cpdef double search(self, int depth):
-        self.eval_count = 0
-        return self._search(depth, -100000.0, 100000.0)
+    cpdef double search(self, int depth, double alpha = -1e9, double beta = 1e9):
+        """
+        Alpha-beta search from the side to move. Releases the GIL, so per-thread board clones can
+        search in parallel; with a native evaluator, give each its own slot in set_native_batch_eval.
+        """
+        cdef float score
+        if depth < 0 or depth >= MAX_SEARCH_DEPTH:
+            raise ValueError(f"depth must be in [0, {MAX_SEARCH_DEPTH}), got {depth}")
+        self._ensure_move_history()
+        self.ply = 0
+        with nogil:
+            score = self._search(depth, alpha, beta)
+        self._raise_eval_error()
+        return score
 
-    cpdef int get_eval_count(self):
+    cpdef long long get_eval_count(self):
+        """Leaf evals accumulated by search() since the last reset_eval_count()."""
         return self.eval_count
 
+    cpdef void reset_eval_count(self):
+        self.eval_count = 0
+
     cpdef cnp.ndarray[cnp.int32_t, ndim=1] tokenize(self):
         """
         Returns a NumPy array of 64 int32 tokens, one per square (0-63).
@@ -1431,27 +2036,99 @@ cdef class Board:
         - 14: black king without castling rights
         Tokens range from 0 (empty a1) to 959 (black king no-castle h8).
         """
-        cdef cnp.ndarray[cnp.int32_t, ndim=1] tokens = np.zeros(64, dtype=np.int32)
-        cdef int sq
-        cdef uint8_t ptype
-        cdef uint8_t piece_code
-        cdef bint white_can_castle = (self.castling & (CASTLE_WK | CASTLE_WQ)) != 0
-        cdef bint black_can_castle = (self.castling & (CASTLE_BK | CASTLE_BQ)) != 0
-
-        for sq in range(64):
-            ptype = self._get_piece_at(sq)
-            if ptype == PIECE_NONE:
-                piece_code = 0
-            elif ptype <= 6:  # White (1-6)
-                if ptype < 6:
-                    piece_code = ptype  # 1-5 non-kings
-                else:  # King
-                    piece_code = 6 if white_can_castle else 7
-            else:  # Black (7-12)
-                if ptype < 12:
-                    piece_code = (ptype - 7) + 8  # 8-12 non-kings
-                else:  # King
-                    piece_code = 13 if black_can_castle else 14
-            tokens[sq] = <cnp.int32_t>(sq * 15 + piece_code)
-
+        cdef cnp.ndarray[cnp.int32_t, ndim=1] tokens = np.empty(64, dtype=np.int32)
+        self._tokenize_into(<int32_t*>cnp.PyArray_DATA(tokens))
         return tokens
+
+    cdef void _tokenize_into(self, int32_t* out) noexcept nogil:
+        """Write the 64 tokens of tokenize() into out (nogil; used for batched eval).
+        Empty board copied from the LUT, then one LUT gather per set bit of each piece bitboard."""
+        cdef int sq, i, code
+        cdef uint64_t bb
+        cdef const int32_t* lut
+
+        memcpy(out, TOKEN_LUT[0], 64 * sizeof(int32_t))
+
+        for i in range(12):
+            # Bitboard i holds piece type i + 1 (WP..WK, BP..BK)
+            code = TOKEN_CODE[i]
+            if i == 5 and not (self.castling & (CASTLE_WK | CASTLE_WQ)):
+                code += 1
+            elif i == 11 and not (self.castling & (CASTLE_BK | CASTLE_BQ)):
+                code += 1
+            lut = TOKEN_LUT[code]
+            bb = self.pieces[i]
+            while bb:
+                sq = lsb_sq(bb)
+                out[sq] = lut[sq]
+                bb &= bb - 1
+
+
+def root_parallel_search(Board board, list moves, int depth, int num_threads=0):
+    """
+    Search every root move on its own board clone, in parallel over OpenMP threads (GIL released).
+    moves: (fr, to, promo, ...) tuples as from get_moves_list(), best guess first (e.g. the previous
+    iteration's order); num_threads=0 uses the OpenMP default.
+    The first playable move is searched with the full window; its score then bounds the rest, which
+    run in parallel and only get an exact score if they beat it (otherwise a bound no better than it).
+    Returns a list of child scores (the opponent's view, as Board.search after the move; unplayable
+    moves get 1e9) and adds the clones' evals to board's eval count.
+    Clones share board's TT and evaluator; with set_native_batch_eval each thread uses its own model
+    scratch slot, otherwise Python evaluators serialize on the GIL.
+    """
+    cdef int n = len(moves)
+    cdef int i, count = 0, tid
+    cdef float first_score = SCORE_INF  # Set by the first root move; unread when count == 0
+    cdef Board child
+    cdef list children = []
+    cdef cnp.ndarray[cnp.float64_t, ndim=1] scores = np.full(n, SCORE_INF)
+    cdef double* score_ptr = <double*>cnp.PyArray_DATA(scores)
+    cdef void** boards
+    cdef int* move_idx
+    if depth < 0 or depth >= MAX_SEARCH_DEPTH:
+        raise ValueError(f"depth must be in [0, {MAX_SEARCH_DEPTH}), got {depth}")
+
+    boards = <void**>malloc(max(n, 1) * sizeof(void*))
+    move_idx = <int*>malloc(max(n, 1) * sizeof(int))
+    if boards == NULL or move_idx == NULL:
+        free(boards)
+        free(move_idx)
+        raise MemoryError()
+    if num_threads <= 0:
+        num_threads = cychess_max_threads()
+    if board.native_eval != NULL and num_threads > board.eval_slots:
+        num_threads = board.eval_slots
+
+    try:
+        board._ensure_move_history()
+        for i in range(n):
+            child = board.clone()
+            child._copy_search_setup(board)
+            child.ply = 1  # Root moves are one ply below board's position (killer index)
+            if child._make_move(moves[i][0], moves[i][1], moves[i][2]):
+                children.append(child)  # Keeps the clone alive while raw pointers are in use
+                boards[count] = <void*>child
+                move_idx[count] = i
+                count += 1
+
+        with nogil:
+            if count > 0:
+                (<Board>boards[0]).eval_tid = 0
+                (<Board>boards[0]).eval_count = 0
+                first_score = (<Board>boards[0])._search(depth, -SCORE_INF, SCORE_INF)
+                score_ptr[move_idx[0]] = first_score
+            # Siblings only matter if they beat the first move: child score below first_score
+            for i in prange(1, count, num_threads=num_threads, schedule='dynamic'):
+                tid = threadid()
+                (<Board>boards[i]).eval_tid = tid
+                (<Board>boards[i]).eval_count = 0
+                score_ptr[move_idx[i]] = (<Board>boards[i])._search(depth, -SCORE_INF, first_score)
+
+        for i in range(count):
+            board.eval_count += (<Board>boards[i]).eval_count
+        for i in range(count):
+            (<Board>boards[i])._raise_eval_error()
+    finally:
+        free(boards)
+        free(move_idx)
+    return scores.tolist()
@@ -12,6 +12,7 @@
 from libc.math cimport INFINITY
 from libc.stdint cimport uint64_t
 from libcpp.unordered_map cimport unordered_map
+from libcpp.vector cimport vector
 from libcpp cimport bool
 from math import inf  # For Python-side inf
 
@@ -33,34 +34,73 @@ cdef class NegamaxSearch:
     cpdef size_t get_cache_size(self):
         return self.eval_cache.size()
     
+    cdef double _terminal_score(self, object board):
+        if board.is_in_check():
+            if board.white_move():
+                return -80000.0  # White mated: bad for white
+            else:
+                return 80000.0   # Black mated: good for white
+        return 0.0  # Stalemate
+
     cdef double _search(self, object board, int depth):
-        cdef uint64_t key
-        cdef double eval_score
+        """
+        Negamax as an explicit-stack DFS: one frame per open ply (its move list, next move index,
+        best score so far) instead of one call per node, so depth isn't bounded by the call stack.
+        """
         if depth == 0:
             return <double>self.eval_func(board)
-        
-        cdef list moves = board._get_moves_list()
-        if len(moves) == 0:
-            if board.is_in_check():
-                if board.white_move():
-                    return -80000.0  # White mated: bad for white
-                else:
-                    return 80000.0   # Black mated: good for white
-            return 0.0  # Stalemate
-        
-        cdef double max_score = -99999.0
+
+        cdef list frame_moves = []        # Legal moves of each open ply
+        cdef vector[int] next_move        # Index of the next move to try per ply
+        cdef vector[double] max_score     # Best (negated child) score per ply
+        cdef list moves
+        cdef list child_moves
         cdef object move
         cdef double score
-        
-        for move in moves:
-            if board.make_move(move[0], move[1], move[2]):
-                score = self._search(board, depth - 1)
+        cdef int top
+
+        moves = board._get_moves_list()
+        if len(moves) == 0:
+            return self._terminal_score(board)
+        frame_moves.append(moves)
+        next_move.push_back(0)
+        max_score.push_back(-99999.0)
+
+        while True:
+            top = len(frame_moves) - 1
+            moves = frame_moves[top]
+
+            # Ply exhausted: pop it and hand its score to the parent
+            if next_move[top] == len(moves):
+                score = max_score[top]
+                frame_moves.pop()
+                next_move.pop_back()
+                max_score.pop_back()
+                if top == 0:
+                    return score
                 board.undo_move()
-            else:
+                top -= 1
+                if -score > max_score[top]:
+                    max_score[top] = -score
+                continue
+
+            move = moves[next_move[top]]
+            next_move[top] += 1
+            if not board.make_move(move[0], move[1], move[2]):
                 score = 100000.0
-            
+            elif top + 1 == depth:
+                score = <double>self.eval_func(board)
+                board.undo_move()
+            else:
+                child_moves = board._get_moves_list()
+                if len(child_moves) > 0:
+                    frame_moves.append(child_moves)
+                    next_move.push_back(0)
+                    max_score.push_back(-99999.0)
+                    continue
+                score = self._terminal_score(board)
+                board.undo_move()
+
             score = -score
-            if score > max_score:
-                max_score = score
-        
-        return max_score
\ No newline at end of file
+            if score > max_score[top]:
+                max_score[top] = score
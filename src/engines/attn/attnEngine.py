@@ -1,11 +1,12 @@
+import os
 import time
 from typing import Optional
 import torch
 from src.engines.attn.attnModel import AttnModel
 from src.engines.chessEngineBase import ChessEngineBase
-from math import inf
+from src.engines.rootSearch import iterative_root_search
 
-from cychess import Board, square_to_alg
+from cychess import Board, MoveHistory, TranspositionTable, SQ_ALG
 from attn_model import AttnModelCompiled
 
 promo_chars = ['', 'q', 'n', 'b', 'r']
@@ -14,52 +15,43 @@ promo_chars = ['', 'q', 'n', 'b', 'r']
 class AttnEngine(ChessEngineBase):
 
     depth: int
+    num_threads: int
     compiled_model: AttnModelCompiled
+    tt: TranspositionTable
+    move_history: MoveHistory
 
-    def __init__(self, model_path: Optional[str] = None, depth: int = 3):
+    def __init__(self, model_path: Optional[str] = None, depth: int = 3, num_threads: Optional[int] = None):
         model = AttnModel()
         if model_path:
             model.load_state_dict(torch.load(model_path))
             
-        self.compiled_model = model.attn_compile()
+        # Do not torch.compile: tiny model + bs=1 means dispatch is already the cost and compile
+        # only adds guard/graph overhead. The Cython path from .attn_compile() is the fast one.
+        # Only the compiled weights are kept; the torch module is dropped after export
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.compiled_model = model.attn_compile(quantize_head=True, num_threads=self.num_threads)
+        del model
         self.depth = depth
+        self.tt = TranspositionTable()
+        self.move_history = MoveHistory()
 
     def choose_move(self, board: Board) -> Optional[str]:
         legal_moves = board.get_moves_list()
-        legal_move_strs = [f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]}" for move in legal_moves]
 
         start_time = time.time()
         
-        if board.white_move():
-            board.set_eval_func(lambda b: self.compiled_model.forward(b.tokenize()))
-        else:
-            board.set_eval_func(lambda b: -self.compiled_model.forward(b.tokenize()))
+        # Leaf eval: one batched forward per frontier/quiescence node (all sibling positions at once),
+        # called from C so root threads never take the GIL; the model scores for white and the
+        # board flips to the side to move
+        board.set_native_batch_eval(self.compiled_model)
+        board.set_tt(self.tt)
 
-        results = []
-        total_evals = 0
-        for move in legal_moves:
-            if board.make_move(move[0], move[1], move[2]):
-                results.append(board.search(self.depth))
-                board.pop()
-                total_evals += board.get_eval_count()
-            else:
-                results.append(8000)
-
-        best_move = None
-        best_score = -inf
-        best_move_str = ""
-        for move, score in zip(legal_moves, results):
-            score = -score
-            if score > best_score:
-                best_score = score
-                best_move = move
-                best_move_str = f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]}"
-
-            if not board.white_move():
-                pass
+        board.reset_eval_count()
+        best_move = iterative_root_search(board, legal_moves, self.depth, self.num_threads, self.move_history)
 
         total_time = time.time() - start_time
+        total_evals = board.get_eval_count()
         print(f"{total_time:.4f}s ({total_evals:,} evals)")
 
-        if best_move and best_move_str:
-            return best_move_str
+        if best_move:
+            return f"{SQ_ALG[best_move[0]]}{SQ_ALG[best_move[1]]}{promo_chars[best_move[2]]}"
@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 from torch import nn
 import torch.nn.functional as F
@@ -11,7 +12,7 @@ class AttnModel(nn.Module):
     def __init__(self, num_tokens: int = 960, embed_dim: int = 24, head_dim_qk: int = 4, head_dim_v: int = 8):
         """
         Residual sliced attention for chess board eval.
-        - Tokens: 14 piece variants × 64 squares = 896 ids (pos baked in).
+        - Tokens: 15 square states × 64 squares = 960 ids (pos baked in), from Board.tokenize().
         - Embed → [bs, 64, 24]: Q[0:4], K[4:8], V[8:16], E[16:24] (residual).
         - Attn on QKV → Z[64,8]; cat(Z, E) → [64,16] flat → MLP.
         - ~120k ops, ~38k params. Output: [bs] value logit.
@@ -45,7 +46,7 @@ class AttnModel(nn.Module):
         value = self.out(h)                    # [bs, 1]
         return value.squeeze(-1)               # [bs] logit
     
-    def attn_compile(self) -> AttnModelCompiled:
+    def attn_compile(self, quantize_head: bool = False, num_threads: int = 1) -> AttnModelCompiled:
         # Extract state_dict and convert to NumPy (CPU)
         state = self.state_dict()
 
@@ -72,13 +73,26 @@ class AttnModel(nn.Module):
         if out_bias_np.shape != (1,):
             raise ValueError(f"Out bias shape mismatch: expected (1,), got {out_bias_np.shape}")
 
+        # Int8 head: per-output-channel symmetric scale = max|W[:, o]| / 127
+        head_weight_q = head_scale = None
+        if quantize_head:
+            head_scale = np.abs(head_weight_np).max(axis=0) / 127.0  # (16,)
+            head_scale[head_scale == 0] = 1.0
+            head_weight_q = np.ascontiguousarray(
+                np.round(head_weight_np / head_scale).clip(-127, 127).astype(np.int8).T
+            )  # (16, 1024) int8
+            head_scale = head_scale.astype(np.float32)
+
         # Create and return compiled model
         compiled = AttnModelCompiled(
             embed_np,          # (960, 24) float32
             head_weight_np,    # (1024, 16) float32
             head_bias_np,      # (16,) float32
             out_weight_np,     # (16, 1) float32
-            out_bias_np        # (1,) float32
+            out_bias_np,       # (1,) float32
+            head_weight_q=head_weight_q,  # (16, 1024) int8 or None
+            head_scale=head_scale,        # (16,) float32 or None
+            num_threads=num_threads,      # scratch slots for parallel search
         )
         return compiled
 
@@ -93,8 +107,6 @@ if __name__ == "__main__":
 
     summary(model, input_data=tokens_torch)
 
-    scripted_model = torch.jit.script(model)
-
     # 3. FLOPs / Ops (Profiler: CPU time, calls, etc.)
     print("\nProfiler (FLOPs proxy via CPU ops/time):")
     with profile(
@@ -130,7 +142,7 @@ if __name__ == "__main__":
         tokens = board.tokenize()
     elapsed = time.time() - start
     print(
-        f"100k board_to_tokens calls: {elapsed:.3f}s total → {100000/elapsed:.0f} calls/sec"
+        f"100k Board.tokenize calls: {elapsed:.3f}s total → {100000/elapsed:.0f} calls/sec"
     )
     
     compiled_model = model.attn_compile()
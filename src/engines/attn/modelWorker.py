@@ -1,65 +1,98 @@
-import time
+import threading
+from collections import deque
+from typing import Optional
 import torch
-import asyncio
-from math import inf
+
+
+class _EvalRequest:
+    """One pending eval: input row, completion event and result slot."""
+
+    __slots__ = ("input_tensor", "done", "result", "error")
+
+    def __init__(self, input_tensor: torch.Tensor):
+        self.input_tensor = input_tensor
+        self.done = threading.Event()
+        self.result: float = 0.0
+        self.error: Optional[BaseException] = None
 
 
 class ModelWorker:
+    """
+    Batches single-position evals from any number of caller threads into one model call.
+    Callers block in eval() on a per-request event; a background thread drains up to
+    batch_size queued requests whenever it wakes, so a lone caller is never held back
+    waiting for a batch to fill.
+    The worker thread keeps the instance alive, so it is never garbage collected while running:
+    call close() when done, or use it as a context manager (with ModelWorker(model) as worker: ...).
+    """
 
     def __init__(self, model: torch.nn.Module, batch_size: int = 32):
         self.model = model.eval()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model = self.model.to(self.device)
         self.batch_size = batch_size
-        self.eval_queue = asyncio.Queue(maxsize=1024)
-        self.last_flush_time = time.time()
-        self.worker_task = asyncio.create_task(self._worker_loop())
+        self.pending: deque = deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.running = True
+        self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker_thread.start()
 
-    async def _worker_loop(self):
-        batch = []
+    def _worker_loop(self):
         while True:
-            try:
-                item = await asyncio.wait_for(self.eval_queue.get(), timeout=0.001)
-                future, input_tensor = item
-                batch.append((future, input_tensor))
-                now = time.time()
-                if len(batch) >= self.batch_size or (
-                    len(batch) > 0 and (now - self.last_flush_time > 0.5)
-                ):
-                    await self._process_batch(batch)
-                    batch = []
-                    self.last_flush_time = now
-                self.eval_queue.task_done()
-            except asyncio.TimeoutError:
-                if batch:
-                    await self._process_batch(batch)
-                    batch = []
-                continue
+            with self.not_empty:
+                while not self.pending and self.running:
+                    self.not_empty.wait()
+                if not self.running:
+                    return
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            self._process_batch(batch)
 
-    async def _process_batch(self, batch):
-        if not batch:
-            return
-        valid_batch = [(future, inp) for future, inp in batch if not future.cancelled()]
-        if not valid_batch:
-            return
-        futures = [future for future, _ in valid_batch]
-        batch_inputs = torch.cat([inp for _, inp in valid_batch]).to(self.device)
-        with torch.no_grad():
-            outputs = self.model(batch_inputs)
-            if outputs.dim() > 1:
-                outputs = outputs.squeeze(-1).cpu().tolist()
-            else:
+    def _process_batch(self, batch: list):
+        try:
+            batch_inputs = torch.cat([request.input_tensor for request in batch]).to(self.device)
+            with torch.no_grad():
+                outputs = self.model(batch_inputs)
+                if outputs.dim() > 1:
+                    outputs = outputs.squeeze(-1)
                 outputs = outputs.cpu().tolist()
-        for i, future in enumerate(futures):
-            future.set_result(outputs[i])
+            for request, output in zip(batch, outputs):
+                request.result = output
+        except BaseException as e:
+            for request in batch:
+                request.error = e
+        for request in batch:
+            request.done.set()
 
-    async def eval(self, input_tensor: torch.Tensor) -> float:
+    def eval(self, input_tensor: torch.Tensor) -> float:
         if input_tensor.shape[0] != 1:
             raise ValueError("Input must be single sample, e.g., [1, ...]")
-        input_tensor = torch.clone(input_tensor.to("cpu"))
-        future = asyncio.Future()
-        await self.eval_queue.put((future, input_tensor))
-        return await future
+        # No defensive clone: the caller blocks until the result is in, and torch.cat copies into the batch anyway
+        request = _EvalRequest(input_tensor.to("cpu"))
+        with self.not_empty:
+            if not self.running:
+                raise RuntimeError("ModelWorker is closed")
+            self.pending.append(request)
+            self.not_empty.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        with self.not_empty:
+            self.running = False
+            self.not_empty.notify_all()
+        if self.worker_thread is not threading.current_thread():
+            self.worker_thread.join()
+        # Fail anything still queued rather than leave callers blocked
+        while self.pending:
+            request = self.pending.popleft()
+            request.error = RuntimeError("ModelWorker is closed")
+            request.done.set()
+
+    def __enter__(self) -> "ModelWorker":
+        return self
 
-    def __del__(self):
-        self.worker_task.cancel()
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
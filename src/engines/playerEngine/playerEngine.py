@@ -2,7 +2,7 @@ import asyncio
 import time
 from typing import Any, Optional
 from src.engines.chessEngineBase import ChessEngineBase
-from cychess import Board, square_to_alg
+from cychess import Board, SQ_ALG
 from negamax import NegamaxSearch
 from math import inf
 
@@ -13,7 +13,7 @@ class PlayerEngine(ChessEngineBase):
 
     def choose_move(self, board: Board) -> Optional[str]:
         legal_moves = board.get_moves_list()
-        legal_move_strs = [f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]}" for move in legal_moves]
+        legal_move_strs = [f"{SQ_ALG[move[0]]}{SQ_ALG[move[1]]}{promo_chars[move[2]]}" for move in legal_moves]
         legal_move_str = '\t'.join(legal_move_strs)
         
         if len(legal_moves) == 0:
@@ -1,10 +1,11 @@
 import asyncio
+import os
 import time
 from typing import Any, Optional
 from src.engines.chessEngineBase import ChessEngineBase
-from cychess import Board, square_to_alg
+from src.engines.rootSearch import BUDGET_MAX_DEPTH, iterative_root_search
+from cychess import Board, MoveHistory, TranspositionTable, SQ_ALG
 from negamax import NegamaxSearch
-from math import inf
 
 promo_chars = ['', 'q', 'n', 'b', 'r']
 
@@ -12,50 +13,41 @@ promo_chars = ['', 'q', 'n', 'b', 'r']
 class PstEngine(ChessEngineBase):
 
     depth: int
+    num_threads: int
     seacher: NegamaxSearch
+    tt: TranspositionTable
+    move_history: MoveHistory
+    time_budget: Optional[float]
 
-    def __init__(self, depth: int = 3):
+    def __init__(self, depth: int = 3, time_budget: Optional[float] = None, num_threads: Optional[int] = None):
         self.depth = depth
+        self.num_threads = num_threads or os.cpu_count() or 1
+        # Seconds per move; when set, the budget picks the depth (up to BUDGET_MAX_DEPTH) instead of depth
+        self.time_budget = time_budget
         self.searcher = NegamaxSearch(lambda b: b.material_balance())
+        # Kept across moves: entries from the previous search still match transposed positions
+        self.tt = TranspositionTable()
+        self.move_history = MoveHistory()
 
-    def choose_move(self, board: Board) -> Optional[str]:
+    def choose_move(self, board: Board, time_budget: Optional[float] = None) -> Optional[str]:
         legal_moves = board.get_moves_list()
-        legal_move_strs = [f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]} ({move[3]})" for move in legal_moves]
 
         start_time = time.time()
 
-        start_pst = board.eval_pst()
-        
-        if board.white_move():
-            board.set_eval_func(lambda b: 1)
-        else:
-            board.set_eval_func(lambda b: -1)
-
-        results = []
-        total_evals = 0
-        for move in legal_moves:
-            if board.make_move(move[0], move[1], move[2]):
-                results.append(board.search(self.depth, start_pst - 100000.0, start_pst + 100000.0))
-                board.pop()
-                total_evals += board.get_eval_count()
-            else:
-                results.append(8000)
-
-        best_move = None
-        best_score = -inf
-        best_move_str = ""
-        for move, score in zip(legal_moves, results):
-            score = -score
-            if score > best_score:
-                best_score = score
-                best_move = move
-                best_move_str = f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]}"
-
-            if not board.white_move():
-                pass
+        if time_budget is None:
+            time_budget = self.time_budget
+
+        board.set_tt(self.tt)
+
+        max_depth = self.depth if time_budget is None else BUDGET_MAX_DEPTH
+
+        board.reset_eval_count()
+        best_move = iterative_root_search(board, legal_moves, max_depth, self.num_threads,
+                                          self.move_history, time_budget)
 
         total_time = time.time() - start_time
+        total_evals = board.get_eval_count()
         print(f"{total_time:.4f}s ({total_evals:,} evals)")
 
-        if best_move and best_move_str:
-            return best_move_str
+        if best_move:
+            return f"{SQ_ALG[best_move[0]]}{SQ_ALG[best_move[1]]}{promo_chars[best_move[2]]}"
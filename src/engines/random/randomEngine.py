@@ -1,6 +1,6 @@
 from typing import Optional
 import random
-from cychess import Board, square_to_alg
+from cychess import Board, SQ_ALG
 from src.engines.chessEngineBase import ChessEngineBase
 
 promo_chars = ['', 'q', 'n', 'b', 'r']
@@ -12,11 +12,12 @@ class RandomEngine(ChessEngineBase):
         random.seed()
 
     def choose_move(self, board: Board) -> Optional[str]:
-        legal_moves = board.get_moves_list()
+        # Pick by index: only the chosen move crosses into Python
+        move_count = board.generate_moves()
 
-        if len(legal_moves) == 0:
+        if move_count == 0:
             return None
         else:
-            move = random.choice(legal_moves)
+            move = board.get_move(random.randrange(move_count))
 
-            return f"{square_to_alg(move[0])}{square_to_alg(move[1])}{promo_chars[move[2]]}"
+            return f"{SQ_ALG[move[0]]}{SQ_ALG[move[1]]}{promo_chars[move[2]]}"
@@ -0,0 +1,61 @@
+import time
+from typing import Optional
+from math import inf
+
+from cychess import Board, MoveHistory, root_parallel_search
+
+# Effective branching factor used to predict the cost of the next iteration
+SEARCH_EBF = 5.0
+# Depths always searched, whatever the time budget
+MIN_SEARCH_DEPTH = 2
+# Deepest pass under a time budget (root_parallel_search takes depths below cychess's MAX_SEARCH_DEPTH of 50)
+BUDGET_MAX_DEPTH = 49
+
+
+def iterative_root_search(
+    board: Board,
+    moves: list,
+    max_depth: int,
+    num_threads: int,
+    move_history: Optional[MoveHistory] = None,
+    time_budget: Optional[float] = None,
+) -> Optional[tuple]:
+    """
+    Iterative deepening over the root moves with the board's evaluator and TT; returns the best
+    move tuple (None if there are none).
+    Each pass seeds the TT (PV moves) for the next, and its best root move is searched first next
+    pass with the full window; that score bounds the other root moves, which are searched in
+    parallel on board clones (root_parallel_search).
+    move_history is aged and attached so all threads and passes share killers/history.
+    Under a time_budget (seconds), stop once the next depth (~SEARCH_EBF times the last) would overrun it.
+    """
+    if move_history is not None:
+        move_history.age()
+        board.set_move_history(move_history)
+
+    start_time = time.time()
+    results = []
+    for depth in range(1, max_depth + 1):
+        depth_start = time.time()
+        results = root_parallel_search(board, moves, depth, num_threads)
+
+        # Best root move first (child scores are from the opponent's view); only the first
+        # score is exact for sure, the rest are bounds at most as good, so the tail order is rough
+        order = sorted(range(len(moves)), key=lambda i: results[i])
+        moves = [moves[i] for i in order]
+        results = [results[i] for i in order]
+
+        now = time.time()
+        if (time_budget is not None and depth >= MIN_SEARCH_DEPTH
+                and (now - start_time) + (now - depth_start) * SEARCH_EBF > time_budget):
+            break
+
+    # Negamax convention: search() scores for the side to move, so a child's score negates to ours
+    best_move = None
+    best_score = -inf
+    for move, score in zip(moves, results):
+        score = -score
+        if score > best_score:
+            best_score = score
+            best_move = move
+    return best_move
@@ -2,7 +2,7 @@ import asyncio
 import time
 from typing import Optional
 
-from cychess import Board, alg_to_square
+from cychess import Board, ALG_SQ
 
 # Assuming your engines are in these paths; adjust if needed
 from src.engines.attn.attnEngine import AttnEngine
@@ -11,6 +11,8 @@ from src.engines.pstEngine.pstEngine import PstEngine
 from src.engines.random.randomEngine import RandomEngine
 from src.engines.chessEngineBase import ChessEngineBase
 
+promo_map = {"q": 1, "n": 2, "b": 3, "r": 4}
+
 
 def parse_move_alg(move_str: str) -> tuple[int, int, int]:
     """
@@ -22,15 +24,12 @@ def parse_move_alg(move_str: str) -> tuple[int, int, int]:
 
     fr_alg = move_str[:2]
     to_alg = move_str[2:4]
-    promo_char = move_str[4:] if len(move_str) == 5 else ""
+    promo_char = move_str[4:]
 
-    fr_sq = alg_to_square(fr_alg)
-    to_sq = alg_to_square(to_alg)
+    fr_sq = ALG_SQ.get(fr_alg, -1)
+    to_sq = ALG_SQ.get(to_alg, -1)
 
-    promo = 0
-    if promo_char:
-        promo_map = {"q": 1, "n": 2, "b": 3, "r": 4}
-        promo = promo_map.get(promo_char.lower(), 0)
+    promo = promo_map.get(promo_char.lower(), 0)
 
     return fr_sq, to_sq, promo
 
@@ -58,12 +57,14 @@ def run_game(
             break
         moves_history.append(move_str)
 
+    # Side to move tracked locally from here on (flipped on every move played)
+    white_to_move = board.white_move()
     while len(moves_history) // 2 <= max_fullmoves:
         result = board.game_result()
         if result is not None:
             break
 
-        if board.white_move():
+        if white_to_move:
             engine = white_engine
             color = "White"
         else:
@@ -79,6 +80,7 @@ def run_game(
         if not succ:
             print(f"Invalid move attempted: {move_str}")
             break
+        white_to_move = not white_to_move
 
         moves_history.append(move_str)
         if engine.name != "PlayerEngine":
@@ -1,10 +1,10 @@
 import random
 import time
-from cychess import Board, Move, square_to_alg, alg_to_square
+from cychess import Board, Move, SQ_ALG, alg_to_square
 
 def alg_move(move: Move):
     fr, to, promo = move
-    s = f"{square_to_alg(fr)}{square_to_alg(to)}"
+    s = f"{SQ_ALG[fr]}{SQ_ALG[to]}"
     if promo:
         promos = {1: 'q', 2: 'n', 3: 'b', 4: 'r'}
         s += promos[promo]